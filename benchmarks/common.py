@@ -0,0 +1,171 @@
+"""
+Shared helpers for the benchmark scripts in this folder.
+
+The benchmarks re-create the `candidates` and `jobs` indices of the cluster at
+`ES_URL` with a generated dataset. Only point them at a local development
+cluster, e.g. the one started by `docker-compose up elasticsearch`. Every
+benchmark restores the seed data with the default profile when it finishes.
+
+Run the benchmarks from the repository root, e.g.
+`ES_URL=http://localhost:9200 python -m benchmarks.index_profiles`.
+"""
+
+import itertools
+import json
+import random
+import sys
+from pathlib import Path
+
+from elasticsearch import Elasticsearch
+
+SEED_IMAGE_PATH = Path(__file__).parent.parent / "seed_image"
+sys.path.insert(0, str(SEED_IMAGE_PATH))
+
+import populate_es_indices  # noqa: E402
+from skill_dictionary import SkillDictionary  # noqa: E402
+from skill_vectors import SkillVectors  # noqa: E402
+
+from es_lib import ElasticsearchClient  # noqa: E402
+from search_recommend_api.model.filters import Filters  # noqa: E402
+
+# Re-exported for the benchmark scripts
+from benchmarks.stats import measure, percentile, print_table, summarize  # noqa: E402,F401
+
+SALARY_FIELDS = {"candidates": "salary_expectation", "jobs": "max_salary"}
+TARGET_INDEX = {"candidates": "jobs", "jobs": "candidates"}
+
+
+def es_client() -> Elasticsearch:
+    """
+    Returns a low level Elasticsearch client for the cluster at `ES_URL`.
+    """
+    return Elasticsearch(populate_es_indices.ES_URL.split(","), request_timeout=120)
+
+
+def load_seed_dataset() -> dict[str, list[dict]]:
+    """
+    Returns the bulk actions of `seed_image/data` per index name.
+    """
+    dataset = {}
+    for index_name in SALARY_FIELDS:
+        with open(populate_es_indices.DATA_PATH / (index_name + ".json")) as file_pointer:
+            dataset[index_name] = json.load(file_pointer)
+    return dataset
+
+
+def generate_dataset(*, scale: int, seed: int = 0) -> dict[str, list[dict]]:
+    """
+    Generates a dataset `scale` times the size of the seed data.
+
+    Documents are sampled from the seed data with a +-10% salary jitter, so the
+    skill and seniority distributions stay realistic. The generation is
+    deterministic for a given seed, which lets several runs compare on the same
+    data.
+
+    Args:
+        scale (int): Size of the dataset relative to the seed data.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        dict[str, list[dict]]: Bulk actions per index name, with IDs from 1 to N.
+    """
+    rng = random.Random(seed)
+    dataset = {}
+    for index_name, actions in load_seed_dataset().items():
+        salary_field = SALARY_FIELDS[index_name]
+        generated = []
+        for doc_id in range(1, len(actions) * scale + 1):
+            source = dict(rng.choice(actions)["_source"])
+            if source[salary_field] is not None:
+                source[salary_field] = int(source[salary_field] * rng.uniform(0.9, 1.1))
+            generated.append({"_id": doc_id, "_source": source})
+        dataset[index_name] = generated
+    return dataset
+
+
+def seed_dataset(
+    *,
+    client: Elasticsearch,
+    dataset: dict[str, list[dict]],
+    profile_name: str = "default",
+) -> None:
+    """
+    Re-creates both indices with the given profile and inserts the dataset.
+
+    Args:
+        client (Elasticsearch): The low level Elasticsearch client.
+        dataset (dict[str, list[dict]]): Bulk actions per index name.
+        profile_name (str): Name of the index profile in `es_config/profiles`.
+    """
+    index_settings = populate_es_indices.read_yaml(
+        populate_es_indices.ES_CONFIG_PATH / "index_settings.yml"
+    )
+    profile = populate_es_indices.read_profile(profile_name)
+    skill_dictionary = SkillDictionary.from_data(populate_es_indices.DATA_PATH)
+    skill_vectors = SkillVectors.from_data(skill_dictionary, populate_es_indices.DATA_PATH)
+    for index_name, actions in dataset.items():
+        mapping = populate_es_indices.index_setup(
+            es_client=client,
+            index_name=index_name,
+            index_settings=index_settings,
+            profile=profile,
+        )
+        populate_es_indices.populate(
+            es_client=client,
+            index_name=index_name,
+            skill_dictionary=skill_dictionary,
+            skill_vectors=skill_vectors,
+            # Copies keep the routing of one profile out of the next one
+            actions=[dict(action) for action in actions],
+            chunk_size=1000,
+            routing_field=mapping.get("_meta", {}).get("routing_field"),
+        )
+    client.cluster.health(index=list(dataset), wait_for_status="yellow")
+
+
+def filter_combinations() -> list[Filters]:
+    """
+    Returns every non-empty combination of the exact match filters.
+    """
+    names = ["top_skills_match", "seniority_match", "salary_match"]
+    return [
+        Filters(**{name: name in combination for name in names})
+        for size in range(1, len(names) + 1)
+        for combination in itertools.combinations(names, size)
+    ]
+
+
+def recommendation_queries(
+    *, dataset: dict[str, list[dict]], samples: int, seed: int = 0
+) -> list[tuple[ElasticsearchClient, list[dict]]]:
+    """
+    Builds recommendation queries for randomly sampled documents of the dataset.
+
+    Every sampled candidate or job is combined with every filter combination,
+    using the same query builders as the API.
+
+    Args:
+        dataset (dict[str, list[dict]]): Bulk actions per index name.
+        samples (int): Number of sampled documents per index.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        list: (target index client, should queries) pairs.
+    """
+    rng = random.Random(seed)
+    skill_dictionary = SkillDictionary.from_data(populate_es_indices.DATA_PATH)
+    queries = []
+    for index_name, actions in dataset.items():
+        target = ElasticsearchClient(TARGET_INDEX[index_name])
+        for action in rng.sample(actions, min(samples, len(actions))):
+            entity = skill_dictionary.add_skill_ids(dict(action["_source"]))
+            for filters in filter_combinations():
+                try:
+                    should_queries = target.build_should_queries(
+                        entity_data=entity, filters_used=filters
+                    )
+                except ValueError:
+                    continue
+                if should_queries:
+                    queries.append((target, should_queries))
+    return queries
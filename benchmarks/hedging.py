@@ -0,0 +1,88 @@
+"""
+Measures the tail latency of hedged reads against stub nodes.
+
+Every stub node answers after a log-normal delay. One of them pauses now and
+then, like a node in a long GC pause. The same read sequence runs against
+- `round_robin`: the reads cycle through the nodes, like a plain multi-node
+  client, and
+- `hedged`: the `HedgedClient` of the API.
+The report shows the latency percentiles and the extra requests sent by the
+hedging. No Elasticsearch cluster is needed.
+
+Usage:
+    python -m benchmarks.hedging --reads 2000 --pause-rate 0.06
+"""
+
+import argparse
+import itertools
+import random
+import threading
+import time
+
+from benchmarks.stats import measure, print_table, summarize
+from es_lib.hedging import HedgedClient
+
+
+class StubNode:
+    """
+    Answers reads after a log-normal delay, with occasional pauses.
+    """
+
+    def __init__(self, *, median: float, pause: float, pause_rate: float, seed: int) -> None:
+        self.median = median
+        self.pause = pause
+        self.pause_rate = pause_rate
+        self.calls = 0
+        self.__rng = random.Random(seed)
+        self.__lock = threading.Lock()
+
+    def search(self, **kwargs) -> dict:
+        with self.__lock:
+            self.calls += 1
+            delay = self.median * self.__rng.lognormvariate(0, 0.3)
+            if self.__rng.random() < self.pause_rate:
+                delay += self.pause
+        time.sleep(delay)
+        return {"hits": {"hits": []}}
+
+
+def stub_nodes(args: argparse.Namespace) -> list[StubNode]:
+    return [
+        StubNode(
+            median=args.median_ms / 1000,
+            pause=args.pause_ms / 1000,
+            pause_rate=args.pause_rate if node == 0 else 0.0,
+            seed=node,
+        )
+        for node in range(args.nodes)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=3, help="number of stub nodes")
+    parser.add_argument("--reads", type=int, default=2000, help="reads per variant")
+    parser.add_argument("--median-ms", type=float, default=5.0, help="median read latency")
+    parser.add_argument("--pause-ms", type=float, default=200.0, help="duration of a pause")
+    parser.add_argument("--pause-rate", type=float, default=0.06, help="share of reads of node 0 that pause")
+    parser.add_argument("--max-hedge-ratio", type=float, default=0.05, help="cap on the hedged reads")
+    args = parser.parse_args()
+
+    rows = []
+    nodes = stub_nodes(args)
+    cycle = itertools.cycle(nodes)
+    latencies = [latency for _ in range(args.reads) for latency in measure(lambda: next(cycle).search())]
+    rows.append({"variant": "round_robin", **summarize(latencies), "extra_requests": 0.0})
+
+    nodes = stub_nodes(args)
+    client = HedgedClient(nodes, max_hedge_ratio=args.max_hedge_ratio)
+    latencies = [latency for _ in range(args.reads) for latency in measure(lambda: client.search(index="jobs"))]
+    # Waits for the losing requests before counting the calls
+    time.sleep(args.pause_ms / 1000)
+    extra = sum(node.calls for node in nodes) / args.reads - 1
+    rows.append({"variant": "hedged", **summarize(latencies), "extra_requests": extra})
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Compares index profiles from `seed_image/es_config/profiles` on the same
+generated dataset.
+
+For every profile the indices are re-created and filled with identical data,
+then the same recommendation queries are sent and the client side latencies,
+the server side `took` times and the primary store size are reported.
+
+Usage:
+    ES_URL=http://localhost:9200 python -m benchmarks.index_profiles \
+        --profiles default tuned --scale 20 --samples 50
+"""
+
+import argparse
+
+from benchmarks.common import (
+    es_client,
+    generate_dataset,
+    load_seed_dataset,
+    measure,
+    print_table,
+    recommendation_queries,
+    seed_dataset,
+    summarize,
+)
+
+
+def benchmark_profile(*, client, profile_name: str, dataset: dict, queries: list, repeats: int) -> dict:
+    """
+    Seeds the dataset with the given profile and times the queries.
+
+    Returns:
+        dict: One result row for the profile.
+    """
+    seed_dataset(client=client, dataset=dataset, profile_name=profile_name)
+    client.indices.forcemerge(index=list(dataset), max_num_segments=1)
+
+    # Warm up caches and global ordinals before measuring
+    for target, should_queries in queries:
+        target.search_with_bool_queries(should_queries=should_queries)
+
+    latencies, took = [], []
+    for target, should_queries in queries:
+        def run():
+            took.append(target.search_with_bool_queries(should_queries=should_queries)["took"])
+        latencies.extend(measure(run, repeats=repeats))
+
+    stats = client.indices.stats(index=list(dataset), metric="store")
+    return {
+        "profile": profile_name,
+        "store_mb": stats["_all"]["primaries"]["store"]["size_in_bytes"] / 2**20,
+        **{f"client_{k}_ms": v for k, v in summarize(latencies).items()},
+        **{f"took_{k}_ms": v for k, v in summarize(took).items()},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=["default", "tuned"])
+    parser.add_argument("--scale", type=int, default=20, help="dataset size relative to the seed data")
+    parser.add_argument("--samples", type=int, default=50, help="sampled documents per index")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per query")
+    parser.add_argument("--no-restore", action="store_true", help="keep the generated data when done")
+    args = parser.parse_args()
+
+    client = es_client()
+    dataset = generate_dataset(scale=args.scale)
+    queries = recommendation_queries(dataset=dataset, samples=args.samples)
+    try:
+        rows = [
+            benchmark_profile(
+                client=client,
+                profile_name=profile_name,
+                dataset=dataset,
+                queries=queries,
+                repeats=args.repeats,
+            )
+            for profile_name in args.profiles
+        ]
+    finally:
+        if not args.no_restore:
+            seed_dataset(client=client, dataset=load_seed_dataset())
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Compares the reciprocal match endpoint logic with the naive N+1 loop.
+
+Both variants find every reciprocal job of a candidate, not only the top ones.
+The naive loop searches the jobs matching the candidate's criteria, then
+fetches every one of them and checks with a second search whether the
+candidate matches the job's criteria. The reciprocal match applies both
+directions in a single search. Before timing, the benchmark checks that both
+variants return the same job IDs for every sampled candidate and fails if
+they differ. Both variants run against the indices as they are seeded, no
+data is changed.
+
+Usage:
+    ES_URL=http://localhost:9200 python -m benchmarks.reciprocal --samples 20
+"""
+
+import argparse
+import random
+
+from benchmarks.common import load_seed_dataset, measure, print_table, summarize
+from es_lib import ElasticsearchClient
+from search_recommend_api.model.filters import Filters
+
+candidates_index = ElasticsearchClient("candidates")
+jobs_index = ElasticsearchClient("jobs")
+
+# Returns every match in one page, the seed data stays below max_result_window
+MAX_MATCHES = 10000
+
+
+def naive_reciprocal_jobs(candidate_id: int, filters: Filters) -> tuple[set, int]:
+    """
+    Returns the reciprocal jobs found by the N+1 loop and its round trips.
+    """
+    candidate = candidates_index.get_entity(id=candidate_id)
+    forward_queries = jobs_index.build_should_queries(entity_data=candidate, filters_used=filters)
+    response = jobs_index.search(query={"size": MAX_MATCHES, "query": {"bool": {"should": forward_queries}}})
+    round_trips, matches = 2, set()
+    for hit in response["hits"]["hits"]:
+        job = jobs_index.get_entity(id=hit["_id"])
+        # The job's own criteria, restricted to the candidate
+        reverse_queries = candidates_index.build_should_queries(entity_data=job, filters_used=filters)
+        candidates = candidates_index.search(query={
+            "size": 0,
+            "query": {"bool": {"must": [{"ids": {"values": [candidate_id]}}, {"bool": {"should": reverse_queries}}]}},
+        })
+        round_trips += 2
+        if candidates["hits"]["total"]["value"]:
+            matches.add(hit["_id"])
+    return matches, round_trips
+
+
+def reciprocal_jobs(candidate_id: int, filters: Filters) -> tuple[set, int]:
+    """
+    Returns the reciprocal jobs found in one search and its round trips.
+    """
+    candidate = candidates_index.get_entity(id=candidate_id)
+    must_queries = jobs_index.build_reciprocal_must_queries(entity_data=candidate, filters_used=filters)
+    response = jobs_index.search(query={"size": MAX_MATCHES, "query": {"bool": {"must": must_queries}}})
+    return {hit["_id"] for hit in response["hits"]["hits"]}, 2
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=20, help="sampled candidates")
+    args = parser.parse_args()
+
+    filters = Filters(top_skills_match=True, seniority_match=True, salary_match=True)
+    candidate_ids = random.Random(0).sample(
+        [action["_id"] for action in load_seed_dataset()["candidates"]], args.samples
+    )
+
+    for candidate_id in list(candidate_ids):
+        try:
+            naive, _ = naive_reciprocal_jobs(candidate_id, filters)
+            reciprocal, _ = reciprocal_jobs(candidate_id, filters)
+        except ValueError:
+            candidate_ids.remove(candidate_id)
+            continue
+        if naive != reciprocal:
+            raise SystemExit(
+                f"Reciprocal jobs of candidate {candidate_id} differ: {len(naive - reciprocal)} only in "
+                f"the naive loop, {len(reciprocal - naive)} only in the reciprocal match."
+            )
+
+    rows = []
+    for label, variant in (("naive N+1", naive_reciprocal_jobs), ("reciprocal", reciprocal_jobs)):
+        latencies, round_trips, hits = [], [], []
+        for candidate_id in candidate_ids:
+            def run():
+                matches, trips = variant(candidate_id, filters)
+                hits.append(len(matches))
+                round_trips.append(trips)
+            latencies.extend(measure(run))
+        rows.append({
+            "variant": label,
+            "mean_round_trips": sum(round_trips) / len(round_trips),
+            "mean_hits": sum(hits) / len(hits),
+            **{f"{k}_ms": v for k, v in summarize(latencies).items()},
+        })
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Replays recorded API traffic against one or two builds of the API.
+
+The request trace is read from either
+- a capture file written with `CAPTURE_TRACE_PATH` (one JSON object per line,
+  see `search_recommend_api/capture.py`), or
+- an `app.log` file. Its lines do not contain the query string, so every
+  replayed request gets the `--default-query` filters instead.
+
+The trace is replayed at its original timing, scaled by `--speed`, or at a
+fixed `--qps` rate. The latency percentiles and error rate are reported per
+route. With `--baseline`, the same schedule is replayed against a second build
+and the responses are compared request by request.
+
+Usage:
+    python -m benchmarks.replay app.log --target http://localhost:8080 --speed 4
+    python -m benchmarks.replay trace.ndjson --target http://new:8080 \
+        --baseline http://old:8080 --qps 50
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from benchmarks.stats import print_table, summarize
+
+DEFAULT_QUERY = "top_skills_match=true&seniority_match=true&salary_match=true"
+
+# "<asctime> | INFO | GET /candidate/1/recommendJobs | <datetime.now()>"
+_LOG_LINE = re.compile(r"\| INFO \| (?P<method>[A-Z]+) (?P<path>/\S*) \| (?P<time>[\d\- :.]+)$")
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+@dataclass
+class TracedRequest:
+    """
+    One request of a trace.
+    """
+
+    time: float
+    method: str
+    path: str
+    query: str = ""
+
+    @property
+    def route(self) -> str:
+        """
+        The path with IDs replaced by `{id}`, used to group the report.
+        """
+        return _ID_SEGMENT.sub("/{id}", self.path)
+
+
+@dataclass
+class ReplayResult:
+    """
+    The outcome of one replayed request.
+    """
+
+    status: Optional[int]
+    latency_ms: float
+    body: bytes = b""
+    error: Optional[str] = None
+
+    @property
+    def failed(self) -> bool:
+        return self.status is None or self.status >= 500
+
+
+def load_trace(path: str, default_query: str = DEFAULT_QUERY) -> list[TracedRequest]:
+    """
+    Reads a capture file or an `app.log` file into a time ordered trace.
+
+    Args:
+        path (str): The capture or log file.
+        default_query (str): Query string for requests from `app.log`.
+
+    Returns:
+        list[TracedRequest]: The requests sorted by time.
+    """
+    trace = []
+    with open(path, encoding="utf-8") as file_pointer:
+        for line in file_pointer:
+            line = line.strip()
+            if line.startswith("{"):
+                record = json.loads(line)
+                trace.append(TracedRequest(record["t"], record["m"], record["p"], record.get("q", "")))
+                continue
+            match = _LOG_LINE.search(line)
+            if match:
+                started = datetime.fromisoformat(match["time"].strip()).timestamp()
+                trace.append(TracedRequest(started, match["method"], match["path"], default_query))
+    return sorted(trace, key=lambda request: request.time)
+
+
+def schedule(
+    trace: list[TracedRequest], *, speed: float = 1.0, qps: Optional[float] = None
+) -> list[float]:
+    """
+    Returns the send offset of every request in seconds from the start.
+
+    Args:
+        trace (list[TracedRequest]): The requests sorted by time.
+        speed (float): Time scale of the original timing, 2.0 replays twice as fast.
+        qps (Optional[float]): Fixed request rate, overrides the original timing.
+
+    Returns:
+        list[float]: The offsets.
+    """
+    if qps:
+        return [i / qps for i in range(len(trace))]
+    start = trace[0].time if trace else 0.0
+    return [(request.time - start) / speed for request in trace]
+
+
+def send(base_url: str, request: TracedRequest, timeout: float) -> ReplayResult:
+    """
+    Sends one request and measures its latency, reading the whole body.
+    """
+    url = base_url.rstrip("/") + request.path + ("?" + request.query if request.query else "")
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, method=request.method), timeout=timeout) as response:
+            body = response.read()
+            return ReplayResult(response.status, (time.perf_counter() - started) * 1000, body)
+    except urllib.error.HTTPError as error:
+        return ReplayResult(error.code, (time.perf_counter() - started) * 1000, error.read())
+    except Exception as error:
+        return ReplayResult(None, (time.perf_counter() - started) * 1000, error=repr(error))
+
+
+def replay(
+    base_url: str,
+    trace: list[TracedRequest],
+    offsets: list[float],
+    *,
+    concurrency: int = 32,
+    timeout: float = 30.0,
+) -> list[ReplayResult]:
+    """
+    Replays the trace against a build following the schedule.
+
+    Requests are sent from a thread pool, so a slow build does not delay the
+    sending of the following requests unless all `concurrency` workers are busy.
+
+    Args:
+        base_url (str): Base URL of the API build.
+        trace (list[TracedRequest]): The requests to send.
+        offsets (list[float]): Send offsets from `schedule`.
+        concurrency (int): Maximum number of requests in flight.
+        timeout (float): Timeout per request in seconds.
+
+    Returns:
+        list[ReplayResult]: The results, in trace order.
+    """
+    results: list[Optional[ReplayResult]] = [None] * len(trace)
+    in_flight = threading.BoundedSemaphore(concurrency)
+
+    def run(position: int) -> None:
+        try:
+            results[position] = send(base_url, trace[position], timeout)
+        finally:
+            in_flight.release()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        for position, offset in enumerate(offsets):
+            delay = offset - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+            in_flight.acquire()
+            executor.submit(run, position)
+    return results
+
+
+def recommendation_ids(body: bytes) -> Optional[list]:
+    """
+    Returns the recommended IDs of a JSON list or NDJSON body, None otherwise.
+    """
+    try:
+        text = body.decode("utf-8")
+        lines = json.loads(text) if text.lstrip().startswith("[") else [json.loads(line) for line in text.splitlines()]
+        return [line["id"] for line in lines]
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def report(trace: list[TracedRequest], results: list[ReplayResult]) -> list[dict]:
+    """
+    Returns the latency percentiles and error rate per route.
+    """
+    by_route = defaultdict(list)
+    for request, result in zip(trace, results):
+        by_route[request.route].append(result)
+        by_route["all"].append(result)
+    return [
+        {
+            "route": route,
+            "requests": len(route_results),
+            "error_rate": sum(r.failed for r in route_results) / len(route_results),
+            **{f"{k}_ms": v for k, v in summarize(r.latency_ms for r in route_results).items()},
+        }
+        for route, route_results in sorted(by_route.items())
+    ]
+
+
+def diff(trace: list[TracedRequest], target: list[ReplayResult], baseline: list[ReplayResult]) -> list[dict]:
+    """
+    Compares the responses of two builds per route.
+
+    Returns:
+        list[dict]: Per route, the share of requests with a different status,
+        with an identical body and, for recommendation responses, with the same
+        IDs in the same order, plus the mean Jaccard overlap of the ID sets.
+    """
+    by_route = defaultdict(list)
+    for request, new, old in zip(trace, target, baseline):
+        by_route[request.route].append((new, old))
+        by_route["all"].append((new, old))
+
+    rows = []
+    for route, pairs in sorted(by_route.items()):
+        overlaps, same_order = [], []
+        for new, old in pairs:
+            new_ids, old_ids = recommendation_ids(new.body), recommendation_ids(old.body)
+            if new_ids is not None and old_ids is not None:
+                same_order.append(new_ids == old_ids)
+                union = set(new_ids) | set(old_ids)
+                overlaps.append(len(set(new_ids) & set(old_ids)) / len(union) if union else 1.0)
+        rows.append({
+            "route": route,
+            "requests": len(pairs),
+            "status_diff": sum(new.status != old.status for new, old in pairs) / len(pairs),
+            "identical_body": sum(new.body == old.body for new, old in pairs) / len(pairs),
+            "same_ids_order": sum(same_order) / len(same_order) if same_order else float("nan"),
+            "mean_jaccard": sum(overlaps) / len(overlaps) if overlaps else float("nan"),
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace", help="capture file (CAPTURE_TRACE_PATH) or app.log")
+    parser.add_argument("--target", required=True, help="base URL of the build under test")
+    parser.add_argument("--baseline", help="base URL of a build to compare the results with")
+    timing = parser.add_mutually_exclusive_group()
+    timing.add_argument("--speed", type=float, default=1.0, help="time scale of the original timing")
+    timing.add_argument("--qps", type=float, help="fixed request rate instead of the original timing")
+    parser.add_argument("--concurrency", type=int, default=32, help="maximum requests in flight")
+    parser.add_argument("--timeout", type=float, default=30.0, help="timeout per request in seconds")
+    parser.add_argument("--limit", type=int, help="replay only the first N requests")
+    parser.add_argument("--default-query", default=DEFAULT_QUERY, help="query string for app.log requests")
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace, default_query=args.default_query)[: args.limit]
+    if not trace:
+        raise SystemExit(f"No requests found in {args.trace}.")
+    offsets = schedule(trace, speed=args.speed, qps=args.qps)
+
+    builds = {"target": args.target, "baseline": args.baseline}
+    results = {}
+    for name, base_url in builds.items():
+        if base_url:
+            results[name] = replay(base_url, trace, offsets, concurrency=args.concurrency, timeout=args.timeout)
+            print(f"\n{name}: {base_url}")
+            print_table(report(trace, results[name]))
+    if "baseline" in results:
+        print("\nresult diff (target vs baseline)")
+        print_table(diff(trace, results["target"], results["baseline"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Compares fanned-out and routed recommendation queries on the `routed` index
+profile.
+
+The candidates index is seeded with a scaled-up dataset on several shards,
+routed by seniority. The seniority-only candidate recommendations of sampled
+jobs are then sent twice: once to every shard and once with the routing values
+from `ElasticsearchClient.build_routing`. Both variants must find the same
+number of hits, the benchmark fails if they differ. The document count of every
+shard and the seniorities routed to it are printed first, so an uneven spread
+of the routing values is visible.
+
+Usage:
+    ES_URL=http://localhost:9200 python -m benchmarks.routing --scale 100
+"""
+
+import argparse
+import random
+
+from benchmarks.common import (
+    es_client,
+    generate_dataset,
+    load_seed_dataset,
+    measure,
+    print_table,
+    seed_dataset,
+    summarize,
+)
+from es_lib import ElasticsearchClient
+from search_recommend_api.model.filters import Filters
+
+
+def shard_rows(client, index: str, routing_values: list[str]) -> list[dict]:
+    """
+    Returns the document count of every primary shard of an index and the
+    routing values Elasticsearch resolves to it.
+    """
+    client.indices.refresh(index=index)
+    routed = {}
+    for value in routing_values:
+        shard = client.search_shards(index=index, routing=value)["shards"][0][0]["shard"]
+        routed.setdefault(shard, []).append(value)
+    shards = client.cat.shards(index=index, format="json", h="shard,prirep,docs")
+    rows = []
+    for row in sorted(shards, key=lambda row: int(row["shard"])):
+        if row["prirep"] == "p":
+            shard = int(row["shard"])
+            rows.append({"shard": shard, "docs": int(row["docs"] or 0), "routing": ",".join(routed.get(shard, ["-"]))})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", default="routed", help="routed index profile to seed")
+    parser.add_argument("--scale", type=int, default=100, help="dataset size relative to the seed data")
+    parser.add_argument("--samples", type=int, default=200, help="sampled jobs")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per query")
+    parser.add_argument("--no-restore", action="store_true", help="keep the generated data when done")
+    args = parser.parse_args()
+
+    client = es_client()
+    dataset = generate_dataset(scale=args.scale)
+    candidates_index = ElasticsearchClient("candidates")
+    filters = Filters(seniority_match=True)
+    jobs = random.Random(0).sample(dataset["jobs"], args.samples)
+
+    try:
+        seed_dataset(client=client, dataset=dataset, profile_name=args.profile)
+        if candidates_index.routing_field is None:
+            raise SystemExit(f"Profile '{args.profile}' does not route the candidates index.")
+        seniorities = sorted({str(candidate["_source"]["seniority"]).lower() for candidate in dataset["candidates"]})
+        print_table(shard_rows(client, "candidates", seniorities))
+        print()
+
+        queries = []
+        for job in jobs:
+            should_queries = candidates_index.build_should_queries(entity_data=job["_source"], filters_used=filters)
+            routing = candidates_index.build_routing(entity_data=job["_source"], filters_used=filters)
+            fanned_out = candidates_index.search_with_bool_queries(should_queries=should_queries)
+            routed = candidates_index.search_with_bool_queries(should_queries=should_queries, routing=routing)
+            if fanned_out["hits"]["total"] != routed["hits"]["total"]:
+                raise SystemExit(f"Routed hits differ for job {job['_id']}.")
+            queries.append((should_queries, routing))
+
+        rows = []
+        for label, use_routing in (("fan-out", False), ("routed", True)):
+            latencies, took, shards = [], [], []
+            for should_queries, routing in queries:
+                def run():
+                    response = candidates_index.search_with_bool_queries(
+                        should_queries=should_queries, routing=routing if use_routing else None
+                    )
+                    took.append(response["took"])
+                    shards.append(response["_shards"]["total"])
+                latencies.extend(measure(run, repeats=args.repeats))
+            rows.append({
+                "variant": label,
+                "mean_shards": sum(shards) / len(shards),
+                **{f"client_{k}_ms": v for k, v in summarize(latencies).items()},
+                **{f"took_{k}_ms": v for k, v in summarize(took).items()},
+            })
+    finally:
+        if not args.no_restore:
+            seed_dataset(client=client, dataset=load_seed_dataset())
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
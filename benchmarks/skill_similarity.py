@@ -0,0 +1,119 @@
+"""
+Measures recall and latency of the skill similarity (kNN) recommendations.
+
+The indices are seeded with a generated dataset. For sampled candidates and
+jobs, the approximate kNN search of the API is compared with an exact
+brute-force `script_score` search over the same filters, which gives the
+recall@k. The latency of both is reported next to the exact keyword match
+path (`top_skills_match`) the similarity mode replaces.
+
+Usage:
+    ES_URL=http://localhost:9200 python -m benchmarks.skill_similarity --scale 20
+"""
+
+import argparse
+import random
+
+from benchmarks.common import (
+    TARGET_INDEX,
+    es_client,
+    generate_dataset,
+    load_seed_dataset,
+    measure,
+    print_table,
+    seed_dataset,
+    summarize,
+)
+from es_lib import ElasticsearchClient
+from search_recommend_api.model.filters import Filters
+
+FILTERS = {
+    "none": {},
+    "salary": {"salary_match": True},
+    "seniority": {"seniority_match": True},
+    "salary+seniority": {"salary_match": True, "seniority_match": True},
+}
+
+
+def exact_knn_query(*, knn: dict) -> dict:
+    """
+    Builds the brute-force equivalent of a kNN query with `script_score`.
+    """
+    filters = [{"exists": {"field": knn["field"]}}]
+    if "filter" in knn:
+        filters.append(knn["filter"])
+    return {
+        "size": knn["k"],
+        "query": {
+            "script_score": {
+                "query": {"bool": {"filter": filters}},
+                "script": {
+                    "source": f"cosineSimilarity(params.query_vector, '{knn['field']}') + 1.0",
+                    "params": {"query_vector": knn["query_vector"]},
+                },
+            }
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=20, help="dataset size relative to the seed data")
+    parser.add_argument("--samples", type=int, default=50, help="sampled documents per index")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--num-candidates", type=int, default=100)
+    parser.add_argument("--no-restore", action="store_true", help="keep the generated data when done")
+    args = parser.parse_args()
+
+    client = es_client()
+    dataset = generate_dataset(scale=args.scale)
+    rng = random.Random(0)
+    rows = []
+    try:
+        seed_dataset(client=client, dataset=dataset)
+        for filter_name, filter_values in FILTERS.items():
+            filters = Filters(**filter_values)
+            recalls, knn_latencies, exact_latencies, match_latencies = [], [], [], []
+            for index_name, actions in dataset.items():
+                source_index = ElasticsearchClient(index_name)
+                target_index = ElasticsearchClient(TARGET_INDEX[index_name])
+                for action in rng.sample(actions, args.samples):
+                    entity = source_index.get_entity(id=action["_id"])
+                    try:
+                        knn = target_index.build_knn_query(
+                            entity_data=entity, filters_used=filters, k=args.k, num_candidates=args.num_candidates
+                        )
+                        should_queries = target_index.build_should_queries(
+                            entity_data=entity, filters_used=Filters(top_skills_match=True, **filter_values)
+                        )
+                    except ValueError:
+                        continue
+
+                    approximate, exact = {}, {}
+                    knn_latencies += measure(lambda: approximate.update(target_index.search_knn(knn=knn)))
+                    exact_latencies += measure(lambda: exact.update(target_index.search(query=exact_knn_query(knn=knn))))
+                    match_latencies += measure(lambda: target_index.search_with_bool_queries(should_queries=should_queries))
+
+                    exact_ids = {hit["_id"] for hit in exact["hits"]["hits"]}
+                    if exact_ids:
+                        approximate_ids = {hit["_id"] for hit in approximate["hits"]["hits"]}
+                        recalls.append(len(exact_ids & approximate_ids) / len(exact_ids))
+
+            rows.append({
+                "filters": filter_name,
+                f"recall@{args.k}": sum(recalls) / len(recalls),
+                "knn_p50_ms": summarize(knn_latencies)["p50"],
+                "knn_p95_ms": summarize(knn_latencies)["p95"],
+                "exact_knn_p50_ms": summarize(exact_latencies)["p50"],
+                "exact_knn_p95_ms": summarize(exact_latencies)["p95"],
+                "keyword_match_p50_ms": summarize(match_latencies)["p50"],
+                "keyword_match_p95_ms": summarize(match_latencies)["p95"],
+            })
+    finally:
+        if not args.no_restore:
+            seed_dataset(client=client, dataset=load_seed_dataset())
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
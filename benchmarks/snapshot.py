@@ -0,0 +1,108 @@
+"""
+Compares the memory-mapped snapshot with the JSON data files.
+
+A generated dataset is written both as JSON bulk actions, like the files in
+`seed_image/data`, and as a snapshot to a temporary folder. The benchmark
+reports the load time of each format and the time of an offline matching pass
+that counts, for sampled jobs, the candidates within the job's max salary and
+seniorities: a Python loop over the JSON documents against vectorized numpy
+over the mapped columns. No Elasticsearch cluster is needed.
+
+Usage:
+    python -m benchmarks.snapshot --scale 100
+"""
+
+import argparse
+import json
+import random
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.common import generate_dataset, measure, print_table, summarize
+from es_lib import Snapshot
+from skill_dictionary import SkillDictionary
+from snapshot_writer import write_snapshot
+
+
+def load_json(path: Path) -> dict[str, list[dict]]:
+    dataset = {}
+    for index_name in ("candidates", "jobs"):
+        with open(path / (index_name + ".json")) as file_pointer:
+            dataset[index_name] = json.load(file_pointer)
+    return dataset
+
+
+def match_json(dataset: dict[str, list[dict]], job_ids: list[int]) -> list[int]:
+    jobs = {action["_id"]: action["_source"] for action in dataset["jobs"]}
+    counts = []
+    for job_id in job_ids:
+        job = jobs[job_id]
+        counts.append(sum(
+            candidate["_source"]["salary_expectation"] is not None
+            and candidate["_source"]["salary_expectation"] <= job["max_salary"]
+            and candidate["_source"]["seniority"] in job["seniorities"]
+            for candidate in dataset["candidates"]
+        ))
+    return counts
+
+
+def match_snapshot(snapshot: Snapshot, job_ids: list[int]) -> list[int]:
+    candidates, jobs = snapshot.candidates, snapshot.jobs
+    # The NaN salaries of candidates compare False, like the missing ones above
+    has_seniority = candidates.seniorities >= 0
+    seniority_bits = np.left_shift(1, np.where(has_seniority, candidates.seniorities, 0))
+    counts = []
+    for job_id in job_ids:
+        position = jobs.position(job_id)
+        matches = (
+            (candidates.salaries <= jobs.salaries[position])
+            & has_seniority
+            & (seniority_bits & int(jobs.seniorities[position]) != 0)
+        )
+        counts.append(int(np.count_nonzero(matches)))
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=100, help="dataset size relative to the seed data")
+    parser.add_argument("--samples", type=int, default=20, help="sampled jobs of the matching pass")
+    parser.add_argument("--repeats", type=int, default=5, help="repeats per measurement")
+    args = parser.parse_args()
+
+    dataset = generate_dataset(scale=args.scale)
+    skill_dictionary = SkillDictionary.from_data()
+    for actions in dataset.values():
+        for action in actions:
+            skill_dictionary.add_skill_ids(action["_source"])
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = Path(folder)
+        for index_name, actions in dataset.items():
+            with open(path / (index_name + ".json"), "w") as file_pointer:
+                json.dump(actions, file_pointer)
+        write_snapshot(path=path / "snapshot", actions=dataset, skill_dictionary=skill_dictionary)
+
+        loaded = {"json": load_json(path), "snapshot": Snapshot.load(path / "snapshot")}
+        job_ids = random.Random(0).sample([action["_id"] for action in dataset["jobs"]], args.samples)
+        if match_json(loaded["json"], job_ids) != match_snapshot(loaded["snapshot"], job_ids):
+            raise SystemExit("The snapshot and JSON matching results differ.")
+
+        rows = []
+        for label, load, match in (
+            ("json", lambda: load_json(path), lambda: match_json(loaded["json"], job_ids)),
+            ("snapshot", lambda: Snapshot.load(path / "snapshot"), lambda: match_snapshot(loaded["snapshot"], job_ids)),
+        ):
+            rows.append({
+                "format": label,
+                "documents": sum(map(len, dataset.values())),
+                **{f"load_{k}_ms": v for k, v in summarize(measure(load, args.repeats)).items() if k in ("mean", "p50")},
+                **{f"match_{k}_ms": v for k, v in summarize(measure(match, args.repeats)).items() if k in ("mean", "p50")},
+            })
+        print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Latency statistics and report formatting shared by the benchmark scripts.
+
+Unlike `benchmarks.common`, this module has no dependency on Elasticsearch or
+the seeding script, so tools that only talk HTTP can use it.
+"""
+
+import statistics
+import time
+from typing import Callable, Iterable
+
+
+def measure(run: Callable[[], object], repeats: int = 1) -> list[float]:
+    """
+    Returns the wall clock latencies of `run` in milliseconds.
+    """
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """
+    Returns the given percentile of the values, using the nearest rank.
+    """
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies: Iterable[float]) -> dict[str, float]:
+    """
+    Returns the mean and the p50/p95/p99 latencies.
+    """
+    latencies = list(latencies)
+    return {
+        "mean": statistics.fmean(latencies),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def print_table(rows: list[dict]) -> None:
+    """
+    Prints a list of flat dictionaries as an aligned text table.
+    """
+    columns = list(rows[0])
+    cells = [[f"{row[c]:.2f}" if isinstance(row[c], float) else str(row[c]) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for row in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)))
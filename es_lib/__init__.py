@@ -1 +1,2 @@
 from .elastic_search_client import ElasticsearchClient
+from .snapshot import Snapshot
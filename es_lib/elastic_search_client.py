@@ -1,13 +1,35 @@
 from dotenv import load_dotenv
 import os
-from typing import Union
-from elasticsearch import Elasticsearch
-from elasticsearch.exceptions import NotFoundError
-from es_lib.exceptions import IDNotFoundError
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional, Union
+from elasticsearch.exceptions import BadRequestError, NotFoundError
+from es_lib.exceptions import EmptySkillVectorError, IDNotFoundError
+from es_lib.hedging import HedgedClient
 from search_recommend_api.model.filters import Filters
 from search_recommend_api.model.recommendation_response import RecommendationResponse
+from search_recommend_api.model.match_summary import MatchSummary, SummaryBucket
 load_dotenv(override=True)
+# Comma separated node URLs, reads are hedged if there is more than one
 ES_URL = os.getenv("ES_URL")
+ES_HEDGE_PERCENTILE = float(os.getenv("ES_HEDGE_PERCENTILE", "95"))
+ES_HEDGE_MAX_RATIO = float(os.getenv("ES_HEDGE_MAX_RATIO", "0.05"))
+# Seconds the routing field of an index is cached before it is read again
+ES_ROUTING_FIELD_TTL = float(os.getenv("ES_ROUTING_FIELD_TTL", "30"))
+
+# Salary bands of the match summaries, as (key, from, to) with "to" excluded
+SALARY_BANDS = [
+    ("0-40000", None, 40000),
+    ("40000-60000", 40000, 60000),
+    ("60000-80000", 60000, 80000),
+    ("80000-100000", 80000, 100000),
+    ("100000+", 100000, None),
+]
+
+# Marks the end of a slice in the page queue of `scan_with_bool_queries`
+_SLICE_DONE = object()
 
 
 class ElasticsearchClient:
@@ -19,11 +41,49 @@ class ElasticsearchClient:
         index (str): "candidates"
     """
 
-    __client = Elasticsearch(ES_URL)
+    __client = HedgedClient.from_urls(
+        ES_URL, hedge_percentile=ES_HEDGE_PERCENTILE, max_hedge_ratio=ES_HEDGE_MAX_RATIO
+    )
+    # Index name to (index UUID, routing field, monotonic time it was read)
+    __routing_fields: dict[str, tuple] = {}
 
     def __init__(self, index) -> None:
         self.index = index
 
+    @property
+    def routing_field(self) -> Optional[str]:
+        """
+        The field documents are routed by at index time, if any.
+
+        It is read from the `_meta.routing_field` of the index mapping, which
+        the seeding script sets for routed index profiles. The value is cached
+        for `ES_ROUTING_FIELD_TTL` seconds, and dropped earlier when the index
+        is seen with another UUID, i.e. it was re-created, possibly with
+        another profile.
+        """
+        cached = self.__routing_fields.get(self.index)
+        if cached is None or time.monotonic() - cached[2] > ES_ROUTING_FIELD_TTL:
+            response = self.__client.indices.get(
+                index=self.index,
+                filter_path=["*.settings.index.uuid", "*.mappings._meta.routing_field"],
+            )
+            index = next(iter(response.values()))
+            cached = (
+                index["settings"]["index"]["uuid"],
+                index.get("mappings", {}).get("_meta", {}).get("routing_field"),
+                time.monotonic(),
+            )
+            self.__routing_fields[self.index] = cached
+        return cached[1]
+
+    def __check_index_uuid(self, index: str, uuid: Optional[str]) -> None:
+        """
+        Drops the cached routing field of an index that was re-created.
+        """
+        cached = self.__routing_fields.get(index)
+        if cached is not None and uuid is not None and cached[0] != uuid:
+            self.__routing_fields.pop(index, None)
+
     def get_entity(
         self,
         *,
@@ -42,12 +102,31 @@ class ElasticsearchClient:
             IDNotFoundError: If the ID was not found in the index.
         """
 
+        if self.routing_field:
+            # The routing value is unknown for a bare ID, so look it up on all shards
+            response = self.__client.search(
+                index=self.index, query={"ids": {"values": [id]}}, size=1
+            )
+            if not response["hits"]["hits"]:
+                raise IDNotFoundError(
+                    "ID '{}' was not found in the index '{}'.".format(id, self.index)
+                )
+            return response["hits"]["hits"][0]["_source"]
+
         try:
             return self.__client.get_source(index=self.index, id=id, _source=True)
         except NotFoundError as error:
             raise IDNotFoundError(
                 "ID '{}' was not found in the index '{}'.".format(id, self.index)
             ) from error
+        except BadRequestError as error:
+            # The index was re-created with a routed profile since the cached read
+            if error.error != "routing_missing_exception":
+                raise
+            self.__routing_fields.pop(self.index, None)
+            if not self.routing_field:
+                raise
+            return self.get_entity(id=id)
 
     def get_recommendation_type_output(
         self,
@@ -77,6 +156,68 @@ class ElasticsearchClient:
                relevance_score=hit["_score"]
         ) for hit in response["hits"]["hits"]]
 
+    def get_summary_type_output(
+        self,
+        *,
+        response
+    ) -> MatchSummary:
+        """
+        Utility function to post process an aggregation response from Elasticsearch.
+
+        Args:
+            response: The raw response of `summarize_with_bool_queries`.
+
+        Returns:
+            MatchSummary: The match counts per seniority, salary band and top skill.
+        """
+        if not response:
+            raise ValueError("Response is empty")
+        if "aggregations" not in response:
+            raise ValueError("Response does not contain aggregations")
+
+        aggregations = response["aggregations"]
+        return MatchSummary(
+            total=response["hits"]["total"]["value"],
+            **{
+                name: [
+                    SummaryBucket(key=str(bucket["key"]), count=bucket["doc_count"])
+                    for bucket in aggregations[name]["buckets"]
+                ]
+                for name in ("seniority", "salary", "top_skills")
+            }
+        )
+
+    def build_summary_aggregations(
+        self,
+        *,
+        top_skills_size: int = 10
+    ) -> dict:
+        """
+        Builds the aggregations of a match summary on the index.
+
+        Args:
+            top_skills_size: The number of most frequent top skills to count.
+
+        Returns:
+            The aggregations over seniority, salary bands and top skills.
+        """
+        seniority_field = "seniority" if self.index == "candidates" else "seniorities"
+        salary_field = "salary_expectation" if self.index == "candidates" else "max_salary"
+        salary_ranges = []
+        for key, lower, upper in SALARY_BANDS:
+            salary_range = {"key": key}
+            if lower is not None:
+                salary_range["from"] = lower
+            if upper is not None:
+                salary_range["to"] = upper
+            salary_ranges.append(salary_range)
+
+        return {
+            "seniority": {"terms": {"field": seniority_field}},
+            "salary": {"range": {"field": salary_field, "ranges": salary_ranges}},
+            "top_skills": {"terms": {"field": "top_skills", "size": top_skills_size}}
+        }
+
     def build_salary_match_query(
         self,
         *,
@@ -132,13 +273,20 @@ class ElasticsearchClient:
     def build_top_skills_match_query(
         self,
         *,
-        top_skills_data: list[str]
+        top_skills_data: Union[list[str], list[int]],
+        field: str = "top_skills",
+        reverse: bool = False
     ) -> dict:
         """
         Builds a query to match the top skills of the entity.
 
         Args:
             top_skills_data: The top skills data of the entity to be queried.
+            field: The field to match, either the free-text "top_skills" or the
+                canonical "top_skill_ids" written by the skill dictionary.
+            reverse: Whether to require min(<n_document_top_skills>, 2) shared
+                top skills instead of min(<n_query_top_skills>, 2), i.e. whether
+                the entity has to match the document's top skills.
         
         Returns:
             The top skills match query.
@@ -146,14 +294,20 @@ class ElasticsearchClient:
         if not top_skills_data:
             raise ValueError("Top skills data is empty")
         
+        if reverse:
+            minimum_should_match_script = {
+                "source": f"Math.min(doc['{field}'].size(), 2)"
+            }
+        else:
+            minimum_should_match_script = {
+                "source": "Math.min(params.num_terms, 2)",
+                "params": {"num_terms": len(top_skills_data)}
+            }
         return {
             "terms_set": {
-                "top_skills": {
+                field: {
                     "terms": top_skills_data,
-                    "minimum_should_match_script": {
-                        "source": "Math.min(params.num_terms, 2)",
-                        "params": {"num_terms": len(top_skills_data)}
-                    }
+                    "minimum_should_match_script": minimum_should_match_script
                 }
             }
         }
@@ -161,7 +315,8 @@ class ElasticsearchClient:
         self,
         *,
         entity_data: dict = None,
-        filters_used: Filters = Filters()
+        filters_used: Filters = Filters(),
+        reverse: bool = False
     ) -> list[dict]:
         """
         Builds a list of should queries based on the user's data and provided filters.
@@ -169,6 +324,9 @@ class ElasticsearchClient:
         Args:
             entity_type: Either candidate or job, depending on which index is being queried.
             entity_data: The data of the entity to be queried.
+            reverse: Whether to build the reverse criteria, matching documents
+                whose own criteria the entity fulfils. Only the top skills match
+                differs, the salary and seniority matches are symmetric.
         
         Returns:
             The should queries based on the user's data and provided filters.
@@ -177,10 +335,21 @@ class ElasticsearchClient:
             raise ValueError("Both entitiy_data and filters_used are empty")
 
         should_queries: list[dict] = []
-        if filters_used.top_skills_match == True and "top_skills" in entity_data:
+        if filters_used.top_skills_match == True and "top_skill_ids" in entity_data:
+            # Canonical skill IDs are smaller and merge synonyms, prefer them when indexed
             should_queries.append(
                 self.build_top_skills_match_query(
-                    top_skills_data=entity_data["top_skills"]
+                    top_skills_data=entity_data["top_skill_ids"],
+                    field="top_skill_ids",
+                    reverse=reverse
+                    )
+                )
+        elif filters_used.top_skills_match == True and "top_skills" in entity_data:
+            # Falls back to the doc values of top_skills, which is not indexed
+            should_queries.append(
+                self.build_top_skills_match_query(
+                    top_skills_data=entity_data["top_skills"],
+                    reverse=reverse
                     )
                 )
         if filters_used.seniority_match == True and ("seniority" in entity_data or "seniorities" in entity_data):
@@ -196,6 +365,113 @@ class ElasticsearchClient:
                 )
             )
         return should_queries
+
+    def build_reciprocal_must_queries(
+        self,
+        *,
+        entity_data: dict = None,
+        filters_used: Filters = Filters()
+    ) -> list[dict]:
+        """
+        Builds the must queries of a reciprocal match: the document has to
+        match the entity's criteria and the entity has to match the document's
+        criteria. Within each direction the filters are concatenated by OR.
+
+        Both directions contribute to the relevance score, so the score of a
+        hit is the combined score of both directions.
+
+        Args:
+            entity_data: The data of the entity to be queried.
+            filters_used: The filters provided by the user.
+
+        Returns:
+            The must queries, one boolean should query per direction.
+        """
+        forward_queries: list[dict] = self.build_should_queries(entity_data=entity_data,
+                                                                filters_used=filters_used)
+        reverse_queries: list[dict] = self.build_should_queries(entity_data=entity_data,
+                                                                filters_used=filters_used,
+                                                                reverse=True)
+        if not forward_queries:
+            raise ValueError("No filters to match in both directions")
+
+        return [
+            {"bool": {"should": forward_queries}},
+            {"bool": {"should": reverse_queries}}
+        ]
+
+    def build_knn_query(
+        self,
+        *,
+        entity_data: dict,
+        filters_used: Filters = Filters(),
+        k: int = 10,
+        num_candidates: int = 100
+    ) -> dict:
+        """
+        Builds a kNN query finding the entities with the most similar skills.
+
+        The enabled match filters restrict the nearest neighbours, concatenated
+        by the OR operator like in the relevance search.
+
+        Args:
+            entity_data: The data of the entity to be queried.
+            filters_used: The filters provided by the user.
+            k: The number of nearest neighbours to return.
+            num_candidates: The number of candidates considered per shard.
+
+        Returns:
+            The kNN query.
+
+        Raises:
+            EmptySkillVectorError: If the entity has no skills, and thus no skill vector.
+        """
+        if not entity_data.get("skill_vector"):
+            raise EmptySkillVectorError("Skill vector is empty")
+
+        knn: dict = {
+            "field": "skill_vector",
+            "query_vector": entity_data["skill_vector"],
+            "k": k,
+            "num_candidates": num_candidates
+        }
+        filter_queries: list[dict] = self.build_should_queries(entity_data=entity_data,
+                                                               filters_used=filters_used)
+        if filter_queries:
+            knn["filter"] = {"bool": {"should": filter_queries}}
+        return knn
+
+    def build_routing(
+        self,
+        *,
+        entity_data: dict,
+        filters_used: Filters = Filters()
+    ) -> Optional[str]:
+        """
+        Builds the routing values that confine a recommendation query to the
+        shards holding the matching seniorities.
+
+        Routing is only safe when the seniority match is the only filter. The
+        filters are concatenated by OR, so with any other filter enabled a
+        document of a different seniority can still match and the query has to
+        fan out to every shard.
+
+        Args:
+            entity_data: The data of the entity to be queried.
+            filters_used: The filters provided by the user.
+
+        Returns:
+            The comma separated routing values, or None to query every shard.
+        """
+        if self.routing_field != "seniority":
+            return None
+        if not filters_used.seniority_match or filters_used.salary_match or filters_used.top_skills_match:
+            return None
+        seniorities = entity_data.get("seniorities") if self.index == "candidates" else [entity_data.get("seniority")]
+        if not seniorities:
+            return None
+        # Mirrors the routing values written by the seeding script
+        return ",".join(sorted({str(seniority).lower() for seniority in seniorities}))
         
     def search_with_bool_queries(
         self,
@@ -203,6 +479,7 @@ class ElasticsearchClient:
         should_queries: list[dict] = None,
         must_queries: list[dict] = None,
         return_source=False,
+        routing: Optional[str] = None,
     ):
         """
         Builds a boolean query comprising the provided should and must sub queries.
@@ -211,6 +488,7 @@ class ElasticsearchClient:
             should_queries: the sub-queries that are to be concatenated by the OR operator
             must_queries: the sub-queries that are to be concatenated by the AND operator
             return_source: whether to return the _source field of the document.
+            routing: comma separated routing values restricting the searched shards.
 
         Returns:
             The matching documents.
@@ -223,10 +501,211 @@ class ElasticsearchClient:
                 "bool": {"must": must_queries or [], "should": should_queries or []}
             }
         }
-        return self.search(query=query, return_source=return_source)
+        return self.search(query=query, return_source=return_source, routing=routing)
+
+    def summarize_with_bool_queries(
+        self,
+        *,
+        should_queries: list[dict] = None,
+        must_queries: list[dict] = None,
+        routing: Optional[str] = None,
+    ) -> dict:
+        """
+        Counts the documents matching the boolean query per seniority, salary
+        band and top skill, without fetching any document.
+
+        Args:
+            should_queries: the sub-queries that are to be concatenated by the OR operator
+            must_queries: the sub-queries that are to be concatenated by the AND operator
+            routing: comma separated routing values restricting the searched shards.
+
+        Returns:
+            The aggregation response.
+        """
+        if not (should_queries or must_queries):
+            raise ValueError("Either should_queries or must_queries must be set.")
+
+        return self.__client.search(
+            index=self.index,
+            query={"bool": {"must": must_queries or [], "should": should_queries or []}},
+            aggregations=self.build_summary_aggregations(),
+            size=0,
+            track_total_hits=True,
+            routing=routing,
+        )
+
+    def index_signature(self, indices: list[str]) -> tuple:
+        """
+        Returns a value that changes whenever documents of the indices are
+        added, updated or deleted, or an index is re-created.
+
+        Args:
+            indices: The names of the indices.
+
+        Returns:
+            The signature, comparable with a previous one.
+        """
+        stats = self.__client.indices.stats(index=",".join(indices), metric="docs,indexing")
+        for name, index_stats in stats["indices"].items():
+            self.__check_index_uuid(name, index_stats.get("uuid"))
+        return tuple(
+            (
+                name,
+                index_stats.get("uuid"),
+                index_stats["primaries"]["docs"]["count"],
+                index_stats["primaries"]["indexing"]["index_total"],
+                index_stats["primaries"]["indexing"]["delete_total"],
+            )
+            for name, index_stats in sorted(stats["indices"].items())
+        )
+
+    def scan_with_bool_queries(
+        self,
+        *,
+        should_queries: list[dict] = None,
+        must_queries: list[dict] = None,
+        routing: Optional[str] = None,
+        slices: int = 4,
+        page_size: int = 1000,
+        keep_alive: str = "1m",
+    ) -> Iterator[list[dict]]:
+        """
+        Yields every document matching the boolean query, page by page.
+
+        The documents are read from a point in time with one sliced search per
+        thread. At most `slices` pages wait in a queue for the consumer, the
+        threads block while it is full. A slow consumer therefore slows down
+        the reads from Elasticsearch, and memory stays bounded by roughly
+        `2 * slices * page_size` hits regardless of the number of matches.
+
+        The pages come in no particular order, each hit carries its `_score`.
+        The point in time is opened before this method returns, so callers see
+        an unknown index or an unreachable cluster right away. It is closed once
+        the iterator is exhausted or closed, and otherwise expires after
+        `keep_alive`.
+
+        Args:
+            should_queries: the sub-queries that are to be concatenated by the OR operator
+            must_queries: the sub-queries that are to be concatenated by the AND operator
+            routing: comma separated routing values restricting the searched shards.
+            slices: the number of slices read in parallel.
+            page_size: the number of hits per page.
+            keep_alive: how long the point in time is kept between two pages.
+
+        Returns:
+            An iterator over the hits of every page.
+        """
+        if not (should_queries or must_queries):
+            raise ValueError("Either should_queries or must_queries must be set.")
+
+        # Validated and opened before the generator starts, so callers see the errors right away
+        query = {"bool": {"must": must_queries or [], "should": should_queries or []}}
+        pit_id = self.__client.open_point_in_time(
+            index=self.index, keep_alive=keep_alive, routing=routing
+        )["id"]
+        return self.__scan(
+            pit_id=pit_id,
+            query=query,
+            slices=slices,
+            page_size=page_size,
+            keep_alive=keep_alive,
+        )
+
+    def __scan(
+        self,
+        *,
+        pit_id: str,
+        query: dict,
+        slices: int,
+        page_size: int,
+        keep_alive: str,
+    ) -> Iterator[list[dict]]:
+        """
+        Generator behind `scan_with_bool_queries`, reading the given point in time.
+        """
+        pages: queue.Queue = queue.Queue(maxsize=slices)
+        stop = threading.Event()
+
+        def put(item) -> None:
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def read_slice(slice_id: int) -> None:
+            slice_pit_id, search_after = pit_id, None
+            try:
+                while not stop.is_set():
+                    response = self.__client.search(
+                        pit={"id": slice_pit_id, "keep_alive": keep_alive},
+                        query=query,
+                        slice={"id": slice_id, "max": slices} if slices > 1 else None,
+                        sort=["_shard_doc"],
+                        search_after=search_after,
+                        size=page_size,
+                        source=False,
+                        track_scores=True,
+                        track_total_hits=False,
+                    )
+                    hits = response["hits"]["hits"]
+                    if hits:
+                        put(hits)
+                    if len(hits) < page_size:
+                        break
+                    slice_pit_id, search_after = response["pit_id"], hits[-1]["sort"]
+            except Exception as error:
+                put(error)
+            finally:
+                put(_SLICE_DONE)
+
+        try:
+            with ThreadPoolExecutor(max_workers=slices) as executor:
+                for slice_id in range(slices):
+                    executor.submit(read_slice, slice_id)
+                try:
+                    done = 0
+                    while done < slices:
+                        page = pages.get()
+                        if page is _SLICE_DONE:
+                            done += 1
+                        elif isinstance(page, Exception):
+                            raise page
+                        else:
+                            yield page
+                finally:
+                    # Unblocks the remaining slices if the consumer stops early
+                    stop.set()
+        finally:
+            self.__client.close_point_in_time(id=pit_id)
+
+    def search_knn(
+        self,
+        *,
+        knn: dict,
+        return_source=False,
+        routing: Optional[str] = None,
+    ) -> dict:
+        """
+        Executes an approximate kNN search on the index.
+
+        Args:
+            knn: The kNN query, see `build_knn_query`.
+            return_source: whether to return the _source field of the document.
+            routing: comma separated routing values restricting the searched shards.
+
+        Returns:
+            The nearest documents.
+        """
+        return self.__client.search(
+            index=self.index, knn=knn, size=knn["k"], source=return_source, routing=routing
+        )
 
-    def search(self, query: dict, return_source=False) -> dict:
+    def search(self, query: dict, return_source=False, routing: Optional[str] = None) -> dict:
         """
-        Executes a query on the index.
+        Executes a query on the index, only on the shards of `routing` if given.
         """
-        return self.__client.search(body=query, index=self.index, source=return_source)
+        return self.__client.search(
+            body=query, index=self.index, source=return_source, routing=routing
+        )
@@ -2,3 +2,15 @@ class IDNotFoundError(Exception):
     """
     Raised when a non-exiting id was queried.
     """
+
+
+class EmptySkillVectorError(ValueError):
+    """
+    Raised when a skill similarity match is requested for an entity without skills.
+    """
+
+
+class SnapshotFormatError(Exception):
+    """
+    Raised when a snapshot has an unsupported format or inconsistent arrays.
+    """
@@ -0,0 +1,265 @@
+"""
+Latency-aware node selection and hedged reads over several Elasticsearch nodes.
+
+Every node gets its own low level client. Requests go to the node with the
+lowest exponentially weighted moving average (EWMA) of its response times, so
+a node that slows down, e.g. during a GC pause, stops receiving the traffic.
+
+Read requests (`search` and `get_source`) are hedged: if the first node has
+not answered after the `hedge_percentile` of the recent latencies of the same
+kind of read, a duplicate is sent to the next best node and the first response
+wins. Searches are split into plain, kNN and aggregation searches, as their
+latencies differ widely. Searches on a point in time or scroll, i.e. the pages
+of an export, are neither hedged nor counted as reads, so they do not use up
+the hedge budget of the recommendations.
+
+The number of hedges is capped at `max_hedge_ratio` of the reads, so hedging
+adds a bounded amount of load. The losing request is not cancelled, it
+completes in the background and its latency still updates the EWMA. Hedges
+run in their own small thread pool, so they never queue the first requests of
+new reads. While `max_losers` losing requests are still running, e.g. during a
+long pause of a node, no further reads are hedged.
+
+Every other method, e.g. `indices.stats` or `open_point_in_time`, is sent to
+the best node without hedging.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Optional
+
+from elasticsearch import Elasticsearch
+from elasticsearch.exceptions import TransportError
+
+# The kinds of hedged reads, each with its own latency window
+READ_KINDS = ("search", "search:knn", "search:aggregations", "get_source")
+
+
+def read_kind(method: str, kwargs: dict) -> Optional[str]:
+    """
+    Returns the kind of a read, None if it must not be hedged.
+
+    Args:
+        method (str): "search" or "get_source".
+        kwargs (dict): The keyword arguments of the request.
+
+    Returns:
+        Optional[str]: One of `READ_KINDS`, None for point in time and scroll
+            searches.
+    """
+    if method != "search":
+        return method
+    body = kwargs.get("body") or {}
+    if "pit" in kwargs or "scroll" in kwargs or "pit" in body:
+        return None
+    if "knn" in kwargs or "knn" in body:
+        return "search:knn"
+    if any(kwargs.get(key) or key in body for key in ("aggregations", "aggs")):
+        return "search:aggregations"
+    return "search"
+
+
+class NodeStats:
+    """
+    Observed response times of one node.
+
+    Args:
+        alpha (float): Weight of the latest response time in the EWMA.
+    """
+
+    def __init__(self, alpha: float) -> None:
+        self.alpha = alpha
+        self.ewma: Optional[float] = None
+        self.last_response = 0.0
+
+    def observe(self, latency: float) -> None:
+        if self.ewma is None:
+            self.ewma = latency
+        else:
+            self.ewma = self.alpha * latency + (1 - self.alpha) * self.ewma
+        self.last_response = time.monotonic()
+
+
+class HedgedClient:
+    """
+    Sends requests to the fastest of several nodes and hedges the reads.
+
+    Args:
+        nodes (list[Elasticsearch]): One client per node.
+        hedge_percentile (float): Percentile of the recent latencies of a kind
+            of read after which a read is hedged.
+        max_hedge_ratio (float): Maximum share of reads that are hedged.
+        alpha (float): Weight of the latest response time in the EWMA.
+        window (int): Number of recent latencies per kind of read the hedge
+            delay is computed from.
+        min_samples (int): Latencies of a kind of read needed before it is hedged.
+        probe_interval (int): Every `probe_interval`-th request goes to the node
+            that answered least recently, so a node that recovered is noticed.
+        error_penalty (float): Latency in seconds recorded for a node whose
+            request failed on the transport level, e.g. a connection error.
+        max_losers (Optional[int]): Maximum number of losing requests still
+            running before hedging pauses, and the size of the hedge thread
+            pool. Defaults to twice the number of nodes.
+    """
+
+    def __init__(
+        self,
+        nodes: list[Elasticsearch],
+        *,
+        hedge_percentile: float = 95.0,
+        max_hedge_ratio: float = 0.05,
+        alpha: float = 0.3,
+        window: int = 200,
+        min_samples: int = 20,
+        probe_interval: int = 100,
+        error_penalty: float = 10.0,
+        max_losers: Optional[int] = None,
+    ) -> None:
+        if not nodes:
+            raise ValueError("At least one node must be given.")
+        self.nodes = nodes
+        self.hedge_percentile = hedge_percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+        self.probe_interval = probe_interval
+        self.error_penalty = error_penalty
+        self.max_losers = max_losers or 2 * len(nodes)
+
+        self.stats = [NodeStats(alpha) for _ in nodes]
+        self.latencies = {kind: deque(maxlen=window) for kind in READ_KINDS}
+        self.reads = 0
+        self.hedges = 0
+        self.losers = 0
+        self.__hedges_running = 0
+        self.__requests = 0
+        self.__lock = threading.Lock()
+        self.__executor = ThreadPoolExecutor(max_workers=8 * len(nodes), thread_name_prefix="es-read")
+        self.__hedge_executor = ThreadPoolExecutor(max_workers=self.max_losers, thread_name_prefix="es-hedge")
+
+    @classmethod
+    def from_urls(cls, urls: str, **kwargs) -> "HedgedClient":
+        """
+        Creates the client from a comma separated list of node URLs.
+
+        Args:
+            urls (str): The node URLs, e.g. "http://es01:9200,http://es02:9200".
+            **kwargs: Options of the constructor.
+
+        Returns:
+            HedgedClient: The client.
+        """
+        return cls([Elasticsearch(url.strip()) for url in urls.split(",") if url.strip()], **kwargs)
+
+    def ranked_nodes(self) -> list[int]:
+        """
+        Returns the node positions ordered by their EWMA, unobserved nodes first.
+        """
+        with self.__lock:
+            self.__requests += 1
+            ranked = sorted(range(len(self.nodes)), key=lambda node: self.stats[node].ewma or 0.0)
+            if len(ranked) > 1 and self.__requests % self.probe_interval == 0:
+                stalest = min(ranked, key=lambda node: self.stats[node].last_response)
+                ranked.remove(stalest)
+                ranked.insert(0, stalest)
+        return ranked
+
+    def hedge_delay(self, kind: str) -> Optional[float]:
+        """
+        Returns the delay in seconds after which a read of the given kind is
+        hedged, None if the read must not be hedged.
+        """
+        with self.__lock:
+            latencies = sorted(self.latencies[kind])
+            if len(self.nodes) < 2 or len(latencies) < self.min_samples:
+                return None
+            if self.hedges + 1 > self.max_hedge_ratio * self.reads:
+                return None
+            # Too many requests are still running for nothing, or the hedge pool is busy
+            if self.losers >= self.max_losers or self.__hedges_running >= self.max_losers:
+                return None
+        rank = max(0, min(len(latencies) - 1, round(self.hedge_percentile / 100 * len(latencies)) - 1))
+        return latencies[rank]
+
+    def __observe(self, node: int, kind: str, started: float, future: Future) -> None:
+        latency = time.perf_counter() - started
+        error = future.exception()
+        with self.__lock:
+            if isinstance(error, TransportError):
+                self.stats[node].observe(max(latency, self.error_penalty))
+                return
+            self.stats[node].observe(latency)
+            self.latencies[kind].append(latency)
+
+    def __submit(self, node: int, method: str, kind: str, args: tuple, kwargs: dict, hedge: bool = False) -> Future:
+        started = time.perf_counter()
+        if hedge:
+            with self.__lock:
+                self.hedges += 1
+                self.__hedges_running += 1
+        executor = self.__hedge_executor if hedge else self.__executor
+        future = executor.submit(getattr(self.nodes[node], method), *args, **kwargs)
+        future.add_done_callback(lambda done: self.__observe(node, kind, started, done))
+        if hedge:
+            future.add_done_callback(lambda done: self.__count(hedges_running=-1))
+        return future
+
+    def __count(self, *, hedges_running: int = 0, losers: int = 0) -> None:
+        with self.__lock:
+            self.__hedges_running += hedges_running
+            self.losers += losers
+
+    def __abandon(self, pending: set) -> None:
+        """
+        Counts the requests still running for a read that already has a
+        response as losers until they complete.
+        """
+        for future in pending:
+            self.__count(losers=1)
+            future.add_done_callback(lambda done: self.__count(losers=-1))
+
+    def __read(self, method: str, *args, **kwargs) -> Any:
+        """
+        Sends a read to the best node and hedges it on the next best node.
+        """
+        ranked = self.ranked_nodes()
+        kind = read_kind(method, kwargs)
+        if len(ranked) == 1 or kind is None:
+            return getattr(self.nodes[ranked[0]], method)(*args, **kwargs)
+
+        with self.__lock:
+            self.reads += 1
+        pending = {self.__submit(ranked[0], method, kind, args, kwargs)}
+        standby = ranked[1:]
+
+        delay = self.hedge_delay(kind)
+        if delay is not None:
+            done, _ = wait(pending, timeout=delay)
+            if not done:
+                pending.add(self.__submit(standby.pop(0), method, kind, args, kwargs, hedge=True))
+
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # Several requests may have finished, any success wins over the failures
+            for future in done:
+                if not isinstance(future.exception(), TransportError):
+                    self.__abandon(pending)
+                    return future.result()
+            if not pending and not standby:
+                raise next(iter(done)).exception()
+            if not pending:
+                # The node is unreachable, fail over without counting a hedge
+                pending = {self.__submit(standby.pop(0), method, kind, args, kwargs)}
+
+    def search(self, *args, **kwargs) -> Any:
+        return self.__read("search", *args, **kwargs)
+
+    def get_source(self, *args, **kwargs) -> Any:
+        return self.__read("get_source", *args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        # Any other method or namespace, e.g. `indices`, of the best node
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.nodes[self.ranked_nodes()[0]], name)
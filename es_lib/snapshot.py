@@ -0,0 +1,236 @@
+"""
+Memory-mapped access to the binary snapshot written by the seeding script.
+
+The snapshot holds the same documents as the `candidates` and `jobs` indices
+as columnar `.npy` arrays, see `seed_image/snapshot_writer.py` for the layout.
+Every array is opened with `np.load(mmap_mode="r")`: loading only reads the
+headers, the data is paged in on access and shared between all processes that
+map the same files.
+
+The seeding script writes every snapshot into a new generation directory and
+then points the `current` symlink at it. The link is resolved once per load,
+so all arrays of a `Snapshot` come from the same generation.
+"""
+
+from dotenv import load_dotenv
+import json
+import os
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from es_lib.exceptions import IDNotFoundError, SnapshotFormatError
+
+load_dotenv(override=True)
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH")
+
+SNAPSHOT_FORMAT_VERSION = 1
+SKILL_ID_FIELDS = {"top_skills": "top_skill_ids", "other_skills": "other_skill_ids"}
+CURRENT_LINK = "current"
+
+
+def _load(path: Path) -> np.ndarray:
+    return np.load(path, mmap_mode="r", allow_pickle=False)
+
+
+class StringTable:
+    """
+    Strings stored as one UTF-8 byte array and their start offsets.
+
+    Args:
+        data (np.ndarray): The concatenated UTF-8 bytes.
+        offsets (np.ndarray): Start of every string, plus the end of the last one.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray) -> None:
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position: int) -> str:
+        start, end = self.offsets[position], self.offsets[position + 1]
+        return self.data[start:end].tobytes().decode("utf-8")
+
+
+class IdLists:
+    """
+    Variable length ID lists stored in CSR style, as concatenated values and
+    the start offset of every list.
+
+    Args:
+        values (np.ndarray): The concatenated IDs.
+        indptr (np.ndarray): Start of every list, plus the end of the last one.
+    """
+
+    def __init__(self, values: np.ndarray, indptr: np.ndarray) -> None:
+        self.values = values
+        self.indptr = indptr
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def __getitem__(self, position: int) -> np.ndarray:
+        """
+        Returns the IDs of the list at the given position, as a view.
+        """
+        return self.values[self.indptr[position]:self.indptr[position + 1]]
+
+
+class IndexSnapshot:
+    """
+    The documents of one index. Row i of every array belongs to `ids[i]`.
+
+    Args:
+        index (str): "candidates" or "jobs".
+        path (Path): The folder of the index inside the snapshot.
+        meta (dict): The `meta.json` of the snapshot.
+        skill_names (StringTable): Canonical skill names by skill ID.
+
+    Attributes:
+        ids (np.ndarray): Document IDs in ascending order.
+        salaries (np.ndarray): Salary expectation or max salary, NaN if missing.
+        seniorities (np.ndarray): For candidates, the position of the seniority
+            in `seniority_levels` (-1 if missing). For jobs, a bit mask of
+            these positions.
+        top_skill_ids (IdLists): Canonical top skill IDs per document.
+        other_skill_ids (IdLists): Canonical other skill IDs per document.
+    """
+
+    def __init__(self, index: str, path: Path, meta: dict, skill_names: StringTable) -> None:
+        index_meta = meta["indices"][index]
+        self.index = index
+        self.salary_field = index_meta["salary_field"]
+        self.seniority_field = index_meta["seniority_field"]
+        self.seniority_levels = meta["seniority_levels"]
+        self.skill_names = skill_names
+
+        self.ids = _load(path / "ids.npy")
+        self.salaries = _load(path / "salaries.npy")
+        self.seniorities = _load(path / "seniorities.npy")
+        self.top_skill_ids = IdLists(_load(path / "top_skill_ids.npy"), _load(path / "top_skill_ids.indptr.npy"))
+        self.other_skill_ids = IdLists(
+            _load(path / "other_skill_ids.npy"), _load(path / "other_skill_ids.indptr.npy")
+        )
+
+        columns = (self.ids, self.salaries, self.seniorities)
+        if any(len(column) != index_meta["documents"] for column in columns) or any(
+            len(lists) != index_meta["documents"] for lists in (self.top_skill_ids, self.other_skill_ids)
+        ):
+            raise SnapshotFormatError(f"The {index} arrays do not match the snapshot meta data.")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def position(self, id: int) -> int:
+        """
+        Returns the row of the document with the given ID.
+
+        Raises:
+            IDNotFoundError: If the ID is not part of the snapshot.
+        """
+        position = int(np.searchsorted(self.ids, id))
+        if position == len(self.ids) or self.ids[position] != id:
+            raise IDNotFoundError(f"ID {id} not found in {self.index} snapshot.")
+        return position
+
+    def seniority_of(self, position: int) -> Union[Optional[str], list[str]]:
+        """
+        Returns the seniority of a candidate or the seniorities of a job.
+        """
+        code = int(self.seniorities[position])
+        if self.index == "candidates":
+            return self.seniority_levels[code] if code >= 0 else None
+        return [level for bit, level in enumerate(self.seniority_levels) if code & (1 << bit)]
+
+    def get_entity(self, *, id: int) -> dict:
+        """
+        Returns the document with the given ID, shaped like its index source.
+
+        The skills are the canonical skill names, not the free-text skills of
+        the seed data, and the `skill_vector` is not part of the snapshot. The
+        salary is an int like in the integer field of the index mapping.
+
+        Args:
+            id (int): ID of the document to return.
+
+        Returns:
+            dict: Entity object corresponding to the given ID.
+
+        Raises:
+            IDNotFoundError: If the ID is not part of the snapshot.
+        """
+        position = self.position(id)
+        salary = float(self.salaries[position])
+        entity = {
+            self.seniority_field: self.seniority_of(position),
+            self.salary_field: None if np.isnan(salary) else int(salary),
+        }
+        for field, id_field in SKILL_ID_FIELDS.items():
+            skill_ids = getattr(self, id_field)[position].tolist()
+            entity[field] = [self.skill_names[skill_id] for skill_id in skill_ids]
+            entity[id_field] = skill_ids
+        return entity
+
+
+class Snapshot:
+    """
+    Memory-mapped snapshot of the `candidates` and `jobs` indices.
+
+    Args:
+        path (Union[str, Path]): The snapshot folder written by the seeding script,
+            or one of its generation folders.
+
+    Raises:
+        FileNotFoundError: If the snapshot or one of its arrays is missing.
+        SnapshotFormatError: If the snapshot was written in another format version
+            or its arrays are inconsistent.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        if (self.path / CURRENT_LINK).exists():
+            # Pins the generation, a concurrent seeding only swaps the link
+            self.path = (self.path / CURRENT_LINK).resolve()
+        self.generation = self.path.name
+        with open(self.path / "meta.json", encoding="utf-8") as file_pointer:
+            self.meta = json.load(file_pointer)
+        if self.meta.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise SnapshotFormatError(
+                f"Unsupported snapshot format version {self.meta.get('format_version')}."
+            )
+
+        self.skill_names = StringTable(
+            _load(self.path / "skill_names.npy"), _load(self.path / "skill_names.offsets.npy")
+        )
+        self.indices = {
+            index: IndexSnapshot(index, self.path / index, self.meta, self.skill_names)
+            for index in self.meta["indices"]
+        }
+
+    @classmethod
+    def load(cls, path: Optional[Union[str, Path]] = None) -> "Snapshot":
+        """
+        Maps the snapshot at the given path, defaulting to `SNAPSHOT_PATH`.
+
+        Raises:
+            FileNotFoundError: If no path is given and `SNAPSHOT_PATH` is unset,
+                or the snapshot is missing.
+        """
+        path = path or SNAPSHOT_PATH
+        if not path:
+            raise FileNotFoundError("No snapshot path given and SNAPSHOT_PATH is not set.")
+        return cls(path)
+
+    def __getitem__(self, index: str) -> IndexSnapshot:
+        return self.indices[index]
+
+    @property
+    def candidates(self) -> IndexSnapshot:
+        return self.indices["candidates"]
+
+    @property
+    def jobs(self) -> IndexSnapshot:
+        return self.indices["jobs"]
@@ -0,0 +1,89 @@
+"""
+This module provides a small in-memory cache for results computed from the
+Elasticsearch indices, such as the match summaries.
+
+- Invalidation: The cache is cleared whenever the signature of the indices
+  changes, i.e. when documents were added, updated or deleted, or an index was
+  re-created. The signature is checked at most every `check_interval` seconds.
+- Size: At most `max_entries` results are kept, the least recently used are
+  evicted first.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class IndexCache:
+    """
+    LRU cache that is invalidated when the index signature changes.
+
+    Parameters
+    ----------
+    signature : Callable[[], Hashable]
+        Returns the current signature of the indices the results depend on.
+    max_entries : int, optional
+        The maximum number of cached results. Defaults to 1024.
+    check_interval : float, optional
+        Seconds between two signature checks. Defaults to 5.
+    """
+
+    def __init__(self,
+                 signature: Callable[[], Hashable],
+                 max_entries: int = 1024,
+                 check_interval: float = 5.0) -> None:
+        self.signature: Callable[[], Hashable] = signature
+        self.max_entries: int = max_entries
+        self.check_interval: float = check_interval
+        self._entries: OrderedDict = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+        self._signature: Hashable = None
+        self._checked_at: float = float("-inf")
+
+    def _validate(self) -> None:
+        """
+        Clears the cache if the index signature changed since the last check.
+        """
+        now: float = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        signature: Hashable = self.signature()
+        with self._lock:
+            if signature != self._signature:
+                self._entries.clear()
+                self._signature = signature
+            self._checked_at = now
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Returns the cached result for the key, computing and caching it if missing.
+
+        Parameters
+        ----------
+        key : Hashable
+            The cache key.
+        compute : Callable[[], Any]
+            Computes the result on a cache miss.
+
+        Returns
+        -------
+        Any
+            The cached or computed result.
+        """
+        self._validate()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            signature: Hashable = self._signature
+        value: Any = compute()
+        with self._lock:
+            # Do not cache a result that may predate an invalidation during compute
+            if signature != self._signature:
+                return value
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
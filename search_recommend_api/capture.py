@@ -0,0 +1,115 @@
+"""
+This module records the API traffic into a compact request trace, which the
+replay tool `benchmarks/replay.py` can play back against another build.
+
+- Trace File: Set by the `CAPTURE_TRACE_PATH` environment variable, capturing is
+  disabled when it is not set.
+- Format: One JSON object per line with the request start time `t` (Unix
+  seconds), the HTTP method `m`, the path `p` and the raw query string `q`.
+  Unlike the `app.log` lines, the query string keeps the filters of a request.
+- Writing: The middleware only queues the lines. A background thread writes
+  them, so the event loop never waits for the disk. The file is opened by
+  `start` and closed by `close`, which the app calls in its lifespan.
+"""
+
+import json
+import queue
+import threading
+import time
+from typing import Awaitable, Callable, Optional
+
+from fastapi import Request, Response
+
+
+class TraceCapture:
+    """
+    HTTP middleware appending every request to a trace file.
+
+    Parameters
+    ----------
+    path : str
+        The trace file, new requests are appended to it.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self._lines: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Opens the trace file and starts the thread writing the queued lines.
+        """
+        if self._writer is None:
+            file_pointer = open(self.path, mode="a", encoding="utf-8")
+            self._writer = threading.Thread(
+                target=self._write, args=(file_pointer,), name="trace-capture", daemon=True
+            )
+            self._writer.start()
+
+    def close(self) -> None:
+        """
+        Writes the lines queued so far and closes the trace file.
+        """
+        if self._writer is not None:
+            self._lines.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def _write(self, file_pointer) -> None:
+        with file_pointer:
+            while True:
+                line: Optional[str] = self._lines.get()
+                if line is None:
+                    return
+                file_pointer.write(line)
+                # Flushes once the queue is drained, so bursts are written in one go
+                if self._lines.empty():
+                    file_pointer.flush()
+
+    def record(self, request: Request, started: float) -> None:
+        """
+        Queues one request for the trace file, dropped unless started.
+
+        Parameters
+        ----------
+        request : Request
+            The HTTP request object.
+        started : float
+            The Unix time the request started at.
+        """
+        line: str = json.dumps(
+            {
+                "t": round(started, 6),
+                "m": request.method,
+                "p": request.url.path,
+                "q": request.url.query,
+            },
+            separators=(",", ":"),
+        )
+        if self._writer is not None:
+            self._lines.put(line + "\n")
+
+    async def __call__(
+        self, request: Request, call_next: Callable[[Request], Awaitable[Response]]
+    ) -> Response:
+        started: float = time.time()
+        self.record(request, started)
+        return await call_next(request)
+
+
+def trace_capture_from_env(path: Optional[str]) -> Optional[TraceCapture]:
+    """
+    Returns the trace capture middleware if a trace file is configured.
+
+    Parameters
+    ----------
+    path : Optional[str]
+        The value of `CAPTURE_TRACE_PATH`.
+
+    Returns
+    -------
+    Optional[TraceCapture]
+        The middleware, or None if capturing is disabled.
+    """
+    return TraceCapture(path) if path else None
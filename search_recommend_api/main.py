@@ -5,16 +5,24 @@ Key Components:
 - FastAPI Application: Initializes the FastAPI app with necessary middleware and routes.
 - CORS Middleware: Configures Cross-Origin Resource Sharing (CORS) to allow requests from any origin.
 - API Routing: Includes a router from the `api.controller` module to manage endpoint handlers.
+- Trace Capture: Optionally records every request for the replay tool in `benchmarks/replay.py`.
+- Profiler: Optionally samples the CPU stacks per route, controlled through the `/admin/profiler` endpoints.
 
 Environment Configurations:
 - PORT: The server's port can be defined via the `APP_PORT` environment variable or defaults from `ApiConfig`.
 - HOST: The server's host can be set by the `APP_HOST` environment variable or through `ApiConfig`.
+- CAPTURE_TRACE_PATH: If set, every request is appended to this trace file.
+- PROFILER_ENABLED: If set to true, the profiler endpoints, middleware and signal handlers are installed.
+- PROFILER_OUTPUT_PATH: The file SIGUSR2 writes the collapsed stacks to, `profile.collapsed` by default.
+- ADMIN_TOKEN: The token the `/admin` endpoints require in the `X-Admin-Token` header, they reject every request while it is unset.
 
 Usage:
 Execute this script to start the FastAPI application with predefined configurations.
 """
 
 import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -23,12 +31,31 @@ from fastapi.middleware.cors import CORSMiddleware
 from search_recommend_api.router.index import router as index_router
 from search_recommend_api.router.candidates import router as candidates_router
 from search_recommend_api.router.jobs import router as jobs_router
+from search_recommend_api.router.admin import router as admin_router, profiler
 
 # Import configuration class for API settings
 from search_recommend_api.config import ApiConfig
+from search_recommend_api.capture import TraceCapture, trace_capture_from_env
+from search_recommend_api.profiler import ProfilerMiddleware, install_signal_handlers
+
+# Record the request trace if enabled
+trace_capture: Optional[TraceCapture] = trace_capture_from_env(os.environ.get("CAPTURE_TRACE_PATH"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Opens the trace file on startup and writes its pending lines on shutdown
+    if trace_capture:
+        trace_capture.start()
+    try:
+        yield
+    finally:
+        if trace_capture:
+            trace_capture.close()
+
 
 # Initialize the FastAPI app
-app: FastAPI = FastAPI()
+app: FastAPI = FastAPI(lifespan=lifespan)
 
 # Load configuration settings
 cnf: ApiConfig = ApiConfig()
@@ -46,10 +73,22 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all HTTP headers
 )
 
+# Mark the requests for the profiler if enabled, inside the trace capture middleware
+profiler_enabled: bool = os.environ.get("PROFILER_ENABLED", "").lower() in ("1", "true", "yes")
+if profiler_enabled:
+    app.add_middleware(ProfilerMiddleware, profiler=profiler)
+    install_signal_handlers(profiler, os.environ.get("PROFILER_OUTPUT_PATH", "profile.collapsed"))
+
+# Record the request trace if enabled
+if trace_capture:
+    app.middleware("http")(trace_capture)
+
 # Include router for process handling
 app.include_router(index_router)
 app.include_router(candidates_router)
 app.include_router(jobs_router)
+if profiler_enabled:
+    app.include_router(admin_router)
 
 if __name__ == "__main__":
     # Output to indicate where the server is starting
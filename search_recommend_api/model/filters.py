@@ -13,7 +13,11 @@ class Filters(BaseModel):
         A boolean indicating if we want to use the seniority match.
     salary_match : Optional[bool]
         A boolean indicating if we want to use the salary expectation match.
+    skill_similarity_match : Optional[bool]
+        A boolean indicating if we want to rank by skill similarity instead of
+        relevance, with the other filters restricting the results.
     """
     top_skills_match: Optional[bool] = Field(False, description="Indicates whether to use the top skills match filter.")
     seniority_match: Optional[bool] = Field(False, description="Indicates whether to use the seniority match filter.")
-    salary_match: Optional[bool] = Field(False, description="Indicates whether to use the salary match filter.")
\ No newline at end of file
+    salary_match: Optional[bool] = Field(False, description="Indicates whether to use the salary match filter.")
+    skill_similarity_match: Optional[bool] = Field(False, description="Indicates whether to rank the matches by skill similarity (kNN over the skill vectors).")
\ No newline at end of file
@@ -0,0 +1,37 @@
+from pydantic import BaseModel
+from typing import List
+
+class SummaryBucket(BaseModel):
+    """
+    Output data model for one bucket of a match summary.
+
+    Attributes
+    ----------
+    key: str
+        The seniority, salary band or top skill of the bucket.
+    count: int
+        The number of matching candidates or jobs in the bucket.
+    """
+    key: str
+    count: int
+
+class MatchSummary(BaseModel):
+    """
+    Output data model for the summary of all Candidate or Job matches.
+    
+    Attributes
+    ----------
+    total: int
+        The total number of matching candidates or jobs.
+    seniority: List[SummaryBucket]
+        The number of matches per seniority.
+    salary: List[SummaryBucket]
+        The number of matches per salary band, on the salary expectation of
+        candidates or the max salary of jobs.
+    top_skills: List[SummaryBucket]
+        The number of matches for the most frequent top skills.
+    """
+    total: int
+    seniority: List[SummaryBucket]
+    salary: List[SummaryBucket]
+    top_skills: List[SummaryBucket]
@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from typing import Dict
+
+class ProfilerStatus(BaseModel):
+    """
+    Output data model for the state of the sampling profiler.
+
+    Attributes
+    ----------
+    running: bool
+        Whether the profiler is sampling.
+    interval_ms: float
+        The current time between two samples, grown above the configured one
+        when sampling would exceed the overhead cap.
+    samples: int
+        The number of samples taken since the last reset.
+    overhead: float
+        The share of wall time spent sampling since the last reset.
+    routes: Dict[str, int]
+        The number of busy thread stacks sampled per route.
+    """
+    running: bool
+    interval_ms: float
+    samples: int
+    overhead: float
+    routes: Dict[str, int]
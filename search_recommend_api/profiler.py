@@ -0,0 +1,388 @@
+"""
+This module provides an opt-in sampling CPU profiler for the API.
+
+- Sampling: A background thread periodically reads the Python stack of every
+  thread with `sys._current_frames`. Only threads that used CPU time since the
+  previous sample are counted, so idle threads (the event loop waiting in
+  `select`, an idle thread pool) do not show up.
+- Routes: `ProfilerMiddleware` marks the frame of every request, and a stack
+  containing such a frame is attributed to the route of its request, e.g.
+  `GET /candidate/{id}/recommendJobs`. This covers the middlewares, the
+  dependency resolution, the handler and the response serialization.
+- Thread pool: Synchronous dependencies such as `Filters` and synchronous
+  handlers run in the AnyIO thread pool. The middleware also stores the
+  request in a context variable, and AnyIO runs the work of a worker thread in
+  a copy of the request's context. The sampler finds that context in the
+  worker loop of the thread and attributes the stack to the route of its
+  request. Other thread pool work is attributed to `(thread pool)`.
+- Overhead: The time spent sampling is measured. A sample is skipped while it
+  would take the sampling time above `max_overhead` of the wall time of the
+  sampler, and the interval grows when a single sample costs more than that
+  share of an interval. A sample reads at most `max_threads` threads, in turn,
+  and walks at most `max_frames` frames per thread.
+- Output: `collapsed` returns the stacks in the collapsed format of
+  `flamegraph.pl` and speedscope, one `route;frame;...;frame count` per line.
+
+The profiler is enabled by the `PROFILER_ENABLED` environment variable and is
+then started and stopped through the `/admin/profiler` endpoints, or with the
+SIGUSR1 (toggle) and SIGUSR2 (write the flamegraph file) signals.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import Context, ContextVar
+from types import CodeType, FrameType
+from typing import Optional
+
+UNMATCHED_ROUTE: str = "(unmatched)"
+THREAD_POOL_ROUTE: str = "(thread pool)"
+_THREAD_NUMBER = re.compile(r"([\s_\-]+[0-9a-f]+|\d+)+$")
+# The scope of the request being handled, copied into the thread pool by AnyIO
+_REQUEST_SCOPE: ContextVar = ContextVar("profiler_request_scope", default=None)
+# Frames from the outermost one searched for the context of a worker thread
+_WORKER_FRAMES: int = 4
+
+
+def _thread_cpu_time(thread_id: int) -> Optional[float]:
+    """
+    Returns the CPU time of a thread in seconds, None if it is unavailable.
+    """
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(thread_id))
+    except (AttributeError, OSError):
+        return None
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler aggregating the Python stacks per route.
+
+    Parameters
+    ----------
+    interval : float
+        The target time between two samples in seconds.
+    max_overhead : float
+        The maximum share of wall time spent sampling, e.g. 0.01 for 1%.
+    max_depth : int
+        The maximum number of frames kept per stack, from the innermost frame.
+    max_stacks : int
+        The maximum number of distinct stacks, further stacks are counted
+        under a truncated stack of their route.
+    max_threads : int
+        The maximum number of threads read per sample, further threads are
+        read by the following samples.
+    max_frames : int
+        The maximum number of frames walked per thread, the route of a deeper
+        stack is only found if its request frame is among them.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.005,
+        max_overhead: float = 0.01,
+        max_depth: int = 64,
+        max_stacks: int = 20000,
+        max_threads: int = 64,
+        max_frames: int = 256,
+    ) -> None:
+        self.interval: float = interval
+        self.max_overhead: float = max_overhead
+        self.max_depth: int = max_depth
+        self.max_stacks: int = max_stacks
+        self.max_threads: int = max_threads
+        self.max_frames: int = max_frames
+
+        self.stacks: Counter = Counter()
+        self.samples: int = 0
+        self.skipped: int = 0
+        self.sampling_time: float = 0.0
+        self.current_interval: float = interval
+        self.started: Optional[float] = None
+        self.elapsed: float = 0.0
+
+        self._requests: dict = {}
+        self._labels: dict = {}
+        self._cpu_times: dict = {}
+        self._next_thread: int = 0
+        # Reentrant, as the SIGUSR1 handler may interrupt the main thread holding it
+        self._lock: threading.RLock = threading.RLock()
+        self._stop: threading.Event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def overhead(self) -> float:
+        """
+        The share of wall time spent sampling since the profiler was reset.
+        """
+        elapsed: float = self.elapsed + (time.perf_counter() - self.started if self.running else 0.0)
+        return self.sampling_time / elapsed if elapsed else 0.0
+
+    def start(self, interval: Optional[float] = None) -> bool:
+        """
+        Starts sampling, returns False if the profiler is already running.
+        """
+        with self._lock:
+            if self.running:
+                return False
+            if interval:
+                self.interval = interval
+            self.current_interval = self.interval
+            self.started = time.perf_counter()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> bool:
+        """
+        Stops sampling and keeps the stacks, returns False if it was not running.
+        """
+        with self._lock:
+            if not self.running:
+                return False
+            self._stop.set()
+            self._thread.join()
+            self.elapsed += time.perf_counter() - self.started
+            return True
+
+    def toggle(self) -> bool:
+        """
+        Starts or stops sampling, returns whether the profiler is now running.
+        """
+        if not self.stop():
+            self.start()
+        return self.running
+
+    def reset(self) -> None:
+        """
+        Drops the collected stacks.
+        """
+        with self._lock:
+            self.stacks = Counter()
+            self.samples = 0
+            self.skipped = 0
+            self.sampling_time = 0.0
+            self.elapsed = 0.0
+            self.started = time.perf_counter()
+
+    def enter_request(self, frame: FrameType, scope: dict) -> None:
+        self._requests[frame] = scope
+
+    def exit_request(self, frame: FrameType) -> None:
+        self._requests.pop(frame, None)
+
+    def route_of(self, scope: dict) -> str:
+        """
+        Returns the route label of a request scope, e.g. `GET /job/{id}`.
+        """
+        route = getattr(scope.get("route"), "path", None)
+        return f"{scope.get('method')} {route}" if route else UNMATCHED_ROUTE
+
+    def _label(self, code: CodeType) -> str:
+        label: Optional[str] = self._labels.get(code)
+        if label is None:
+            path: str = code.co_filename
+            for prefix in sorted((entry or os.getcwd() for entry in sys.path), key=len, reverse=True):
+                if path.startswith(prefix + os.sep):
+                    path = path[len(prefix) + 1:]
+                    break
+            label = f"{code.co_name} ({path}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    @staticmethod
+    def _worker_scope(outer_frames: deque) -> Optional[dict]:
+        """
+        Returns the request scope of the context a thread pool worker runs,
+        read from the `context` local of its worker loop, e.g.
+        `WorkerThread.run` of AnyIO.
+        """
+        for frame in outer_frames:
+            if frame.f_code.co_name != "run":
+                continue
+            context = frame.f_locals.get("context")
+            if isinstance(context, Context):
+                return context.get(_REQUEST_SCOPE)
+        return None
+
+    def _busy(self, thread_id: int) -> bool:
+        """
+        Returns whether a thread used CPU time since the previous sample, or
+        since it was started if it is new.
+        """
+        cpu_time: Optional[float] = _thread_cpu_time(thread_id)
+        if cpu_time is None:
+            return True
+        previous: Optional[float] = self._cpu_times.get(thread_id)
+        self._cpu_times[thread_id] = cpu_time
+        return previous is None or cpu_time > previous
+
+    def sample(self) -> None:
+        """
+        Adds the stacks of the busy threads, except the sampler itself.
+        """
+        frames: dict = sys._current_frames()
+        # Forget the CPU times of the threads that ended
+        for thread_id in self._cpu_times.keys() - frames.keys():
+            del self._cpu_times[thread_id]
+        own_id: int = threading.get_ident()
+        thread_ids: list = sorted(thread_id for thread_id in frames if thread_id != own_id)
+        if len(thread_ids) > self.max_threads:
+            # Read the threads in turn, starting after those of the previous sample
+            first: int = self._next_thread % len(thread_ids)
+            thread_ids = (thread_ids[first:] + thread_ids[:first])[:self.max_threads]
+            self._next_thread = first + self.max_threads
+        thread_names: Optional[dict] = None
+        for thread_id in thread_ids:
+            if not self._busy(thread_id):
+                continue
+            frame: Optional[FrameType] = frames[thread_id]
+            labels: list = []
+            outer_frames: deque = deque(maxlen=_WORKER_FRAMES)
+            route: Optional[str] = None
+            walked: int = 0
+            while frame is not None and walked < self.max_frames:
+                if len(labels) < self.max_depth:
+                    labels.append(self._label(frame.f_code))
+                scope: Optional[dict] = self._requests.get(frame)
+                if scope is not None and route is None:
+                    route = self.route_of(scope)
+                outer_frames.append(frame)
+                frame = frame.f_back
+                walked += 1
+            # The worker loop is only among the outer frames if the walk reached them
+            if route is None and frame is None:
+                worker_scope: Optional[dict] = self._worker_scope(outer_frames)
+                if worker_scope is not None:
+                    route = self.route_of(worker_scope)
+            if route is None:
+                if thread_names is None:
+                    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+                thread_name: str = _THREAD_NUMBER.sub("", thread_names.get(thread_id, ""))
+                route = THREAD_POOL_ROUTE if thread_name == "AnyIO worker thread" else f"(thread {thread_name})"
+            stack: str = ";".join([route, *reversed(labels)])
+            if stack not in self.stacks and len(self.stacks) >= self.max_stacks:
+                stack = f"{route};(truncated)"
+            self.stacks[stack] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        # Threads running before the start only count once they use CPU time
+        self._cpu_times = {thread_id: _thread_cpu_time(thread_id) for thread_id in sys._current_frames()}
+        cost: float = 0.0
+        while not self._stop.wait(self.current_interval):
+            # Skip the sample while it would take the sampling time above the budget,
+            # expecting it to cost as much as the previous one
+            elapsed: float = self.elapsed + time.perf_counter() - self.started
+            if self.sampling_time + cost > self.max_overhead * elapsed:
+                self.skipped += 1
+                continue
+            started: float = time.perf_counter()
+            self.sample()
+            cost = time.perf_counter() - started
+            self.sampling_time += cost
+            # Back off while a sample costs more than the overhead budget of an interval
+            self.current_interval = max(self.interval, cost / self.max_overhead)
+
+    def collapsed(self, route: Optional[str] = None) -> str:
+        """
+        Returns the stacks in the collapsed flamegraph format.
+
+        Parameters
+        ----------
+        route : Optional[str]
+            Only return the stacks of this route, e.g. `GET /job/{id}`.
+
+        Returns
+        -------
+        str
+            One `route;frame;...;frame count` line per stack, outermost frame first.
+        """
+        stacks: list = sorted(self.stacks.items())
+        return "".join(
+            f"{stack} {count}\n"
+            for stack, count in stacks
+            if route is None or stack.split(";", 1)[0] == route
+        )
+
+    def routes(self) -> dict:
+        """
+        Returns the number of samples per route.
+        """
+        routes: Counter = Counter()
+        for stack, count in list(self.stacks.items()):
+            routes[stack.split(";", 1)[0]] += count
+        return dict(routes.most_common())
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware marking the frame of every request for the profiler.
+
+    It is a plain ASGI middleware so the inner middlewares, the routing and the
+    handler run in its frame. It must be added inside any `BaseHTTPMiddleware`,
+    which runs the rest of the application in a separate task.
+
+    Parameters
+    ----------
+    app : ASGI application
+        The wrapped application.
+    profiler : SamplingProfiler
+        The profiler the requests are reported to.
+    """
+
+    def __init__(self, app, profiler: SamplingProfiler) -> None:
+        self.app = app
+        self.profiler: SamplingProfiler = profiler
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        frame: FrameType = sys._getframe()
+        self.profiler.enter_request(frame, scope)
+        token = _REQUEST_SCOPE.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _REQUEST_SCOPE.reset(token)
+            self.profiler.exit_request(frame)
+
+
+def install_signal_handlers(profiler: SamplingProfiler, output_path: str) -> bool:
+    """
+    Toggles the profiler on SIGUSR1 and writes its flamegraph file on SIGUSR2.
+
+    Parameters
+    ----------
+    profiler : SamplingProfiler
+        The profiler to control.
+    output_path : str
+        The file the collapsed stacks are written to.
+
+    Returns
+    -------
+    bool
+        Whether the handlers were installed, which requires the main thread
+        of a platform with these signals.
+    """
+    import signal
+
+    if not hasattr(signal, "SIGUSR1") or threading.current_thread() is not threading.main_thread():
+        return False
+
+    def dump(signum, frame) -> None:
+        with open(output_path, mode="w", encoding="utf-8") as file_pointer:
+            file_pointer.write(profiler.collapsed())
+
+    signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.toggle())
+    signal.signal(signal.SIGUSR2, dump)
+    return True
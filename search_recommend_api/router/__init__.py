@@ -1,6 +1,6 @@
 import traceback
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from search_recommend_api.logger import _log
 from es_lib import ElasticsearchClient
 from search_recommend_api.model.filters import Filters
@@ -8,6 +8,7 @@ from search_recommend_api.model.recommendation_response import RecommendationRes
 # Making these accessible as part of the package API
 __all__ = ['APIRouter', 
            'JSONResponse', 
+           'StreamingResponse', 
            '_log', 
            'traceback', 
            'ElasticsearchClient',
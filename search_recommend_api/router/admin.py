@@ -0,0 +1,196 @@
+import os
+import secrets
+from typing import Optional
+from fastapi import Header, Query
+from fastapi.responses import PlainTextResponse
+from search_recommend_api.router import (
+    APIRouter,
+    traceback,
+    HTTPException,
+    Depends,
+    _log
+)
+from search_recommend_api.model.profiler_status import ProfilerStatus
+from search_recommend_api.profiler import SamplingProfiler
+
+
+async def _require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    Rejects requests whose `X-Admin-Token` header does not match `ADMIN_TOKEN`
+
+    The endpoints are closed as long as `ADMIN_TOKEN` is not set, since the
+    API allows requests from any origin.
+
+    Parameters
+    ----------
+    x_admin_token : Optional[str]
+        The token sent in the `X-Admin-Token` header
+    """
+    admin_token: str = os.environ.get("ADMIN_TOKEN", "")
+    if not admin_token:
+        _log("Forbidden: ADMIN_TOKEN is not set for /admin", format="error")
+        raise HTTPException(status_code=403, detail="The admin endpoints are disabled, ADMIN_TOKEN is not set.")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token.encode(), admin_token.encode()):
+        _log("Unauthorized: Invalid admin token for /admin", format="error")
+        raise HTTPException(status_code=401, detail="A valid X-Admin-Token header is required.")
+
+# Initialize API router and the profiler, which only samples once started
+router: APIRouter = APIRouter(
+    dependencies=[Depends(_require_admin_token)],
+    responses={
+        401: {"description": "Missing or invalid X-Admin-Token header"},
+        403: {"description": "ADMIN_TOKEN is not set"}
+    }
+)
+profiler: SamplingProfiler = SamplingProfiler(
+    interval=float(os.environ.get("PROFILER_INTERVAL_MS", 5)) / 1000,
+    max_overhead=float(os.environ.get("PROFILER_MAX_OVERHEAD", 0.01)),
+)
+
+
+def _status() -> ProfilerStatus:
+    return ProfilerStatus(
+        running=profiler.running,
+        interval_ms=profiler.current_interval * 1000,
+        samples=profiler.samples,
+        overhead=profiler.overhead,
+        routes=profiler.routes(),
+    )
+
+@router.get(
+    "/admin/profiler",
+    response_model=ProfilerStatus,
+    summary="To get the state of the sampling profiler",
+    responses={
+        200: {"model": ProfilerStatus},
+        500: {"description": "Internal Server Error"}
+    }
+)
+async def _profiler_status() -> ProfilerStatus:
+    """
+    Gets the state of the profiler and the number of samples per route
+
+    Returns
+    -------
+    ProfilerStatus
+        The state of the profiler.
+    """
+    try:
+        _log("GET /admin/profiler", format="info")
+        return _status()
+    except Exception as e:
+        _log("Internal Server Error: /admin/profiler", format="error")
+        _log(str(e), format="error")
+        _log(traceback.format_exc(), format="error")
+        raise HTTPException(
+            status_code=500,
+            detail="An unexpected error occurred. Please try again later."
+        )
+
+@router.post(
+    "/admin/profiler/start",
+    response_model=ProfilerStatus,
+    summary="To start the sampling profiler",
+    responses={
+        200: {"model": ProfilerStatus},
+        500: {"description": "Internal Server Error"},
+        422: {"description": "Validation Error"}
+    }
+)
+async def _start_profiler(interval_ms: Optional[float] = Query(None, gt=0),
+                          reset: bool = False) -> ProfilerStatus:
+    """
+    Starts sampling, keeping the stacks collected so far unless reset is set
+
+    Parameters
+    ----------
+    interval_ms : Optional[float]
+        The time between two samples, defaults to `PROFILER_INTERVAL_MS`
+    reset : bool
+        Whether to drop the stacks collected so far
+
+    Returns
+    -------
+    ProfilerStatus
+        The state of the profiler.
+    """
+    try:
+        _log("POST /admin/profiler/start", format="info")
+        if reset:
+            profiler.reset()
+        profiler.start(interval=interval_ms / 1000 if interval_ms else None)
+        return _status()
+    except Exception as e:
+        _log("Internal Server Error: /admin/profiler/start", format="error")
+        _log(str(e), format="error")
+        _log(traceback.format_exc(), format="error")
+        raise HTTPException(
+            status_code=500,
+            detail="An unexpected error occurred. Please try again later."
+        )
+
+@router.post(
+    "/admin/profiler/stop",
+    response_model=ProfilerStatus,
+    summary="To stop the sampling profiler",
+    responses={
+        200: {"model": ProfilerStatus},
+        500: {"description": "Internal Server Error"}
+    }
+)
+async def _stop_profiler() -> ProfilerStatus:
+    """
+    Stops sampling, the collected stacks are kept for the flamegraph
+
+    Returns
+    -------
+    ProfilerStatus
+        The state of the profiler.
+    """
+    try:
+        _log("POST /admin/profiler/stop", format="info")
+        profiler.stop()
+        return _status()
+    except Exception as e:
+        _log("Internal Server Error: /admin/profiler/stop", format="error")
+        _log(str(e), format="error")
+        _log(traceback.format_exc(), format="error")
+        raise HTTPException(
+            status_code=500,
+            detail="An unexpected error occurred. Please try again later."
+        )
+
+@router.get(
+    "/admin/profiler/flamegraph",
+    response_class=PlainTextResponse,
+    summary="To get the sampled stacks in the collapsed flamegraph format",
+    responses={
+        200: {"description": "One `route;frame;...;frame count` line per stack"},
+        500: {"description": "Internal Server Error"}
+    }
+)
+async def _profiler_flamegraph(route: Optional[str] = None) -> PlainTextResponse:
+    """
+    Gets the sampled stacks, to be rendered with flamegraph.pl or speedscope
+
+    Parameters
+    ----------
+    route : Optional[str]
+        Only return the stacks of this route, e.g. `GET /candidate/{id}/recommendJobs`
+
+    Returns
+    -------
+    PlainTextResponse
+        The collapsed stacks, outermost frame first.
+    """
+    try:
+        _log("GET /admin/profiler/flamegraph", format="info")
+        return PlainTextResponse(profiler.collapsed(route=route))
+    except Exception as e:
+        _log("Internal Server Error: /admin/profiler/flamegraph", format="error")
+        _log(str(e), format="error")
+        _log(traceback.format_exc(), format="error")
+        raise HTTPException(
+            status_code=500,
+            detail="An unexpected error occurred. Please try again later."
+        )
@@ -1,6 +1,7 @@
 from search_recommend_api.router import (
     APIRouter, 
     JSONResponse, 
+    StreamingResponse,
     Filters,
     traceback,
     ElasticsearchClient,
@@ -10,13 +11,20 @@ from search_recommend_api.router import (
     _log
 )
 from search_recommend_api.model.job import Job
-from typing import List
+from search_recommend_api.model.match_summary import MatchSummary
+from search_recommend_api.cache import IndexCache
+from es_lib.exceptions import EmptySkillVectorError
+from search_recommend_api.router.streaming import NDJSON_MEDIA_TYPE, ndjson_recommendations
+from typing import List, Optional
 
 
 # Initialize API router and Elasticsearch clients
 router: APIRouter = APIRouter()
 jobs_index: ElasticsearchClient = ElasticsearchClient("jobs")
 candidates_index: ElasticsearchClient = ElasticsearchClient("candidates")
+summary_cache: IndexCache = IndexCache(
+    signature=lambda: jobs_index.index_signature(["candidates", "jobs"])
+)
 
 @router.get(
     "/job/{id}",
@@ -86,6 +94,7 @@ async def _recommend_candidates(id: int,
        1. seniority_match
        2. salary_match
        3. top_skills_match
+       4. skill_similarity_match, ranks the matches of the other filters by skill similarity
     
     Returns
     -------
@@ -95,12 +104,27 @@ async def _recommend_candidates(id: int,
     try:
         _log(f"GET /job/{id}/recommendCandidates", format="info")
         jobs_object: dict = jobs_index.get_entity(id=id)
-        should_queries: list[dict] = candidates_index.build_should_queries(entity_data=jobs_object, 
-                                                         filters_used=filters)
-        response = candidates_index.search_with_bool_queries(should_queries=should_queries, 
-                                                       return_source=False)
+        routing: Optional[str] = candidates_index.build_routing(entity_data=jobs_object,
+                                                          filters_used=filters)
+        if filters.skill_similarity_match:
+            knn: dict = candidates_index.build_knn_query(entity_data=jobs_object,
+                                                  filters_used=filters)
+            response = candidates_index.search_knn(knn=knn, return_source=False, routing=routing)
+        else:
+            should_queries: list[dict] = candidates_index.build_should_queries(entity_data=jobs_object, 
+                                                             filters_used=filters)
+            response = candidates_index.search_with_bool_queries(should_queries=should_queries, 
+                                                           return_source=False,
+                                                           routing=routing)
         final_response: List[RecommendationResponse] = candidates_index.get_recommendation_type_output(response=response)
         return final_response
+    except EmptySkillVectorError as e:
+        _log(f"Validation Error: No skills for skill similarity in /job/{id}/recommendCandidates", format="error")
+        _log(str(e), format="error")
+        raise HTTPException(
+            status_code=422,
+            detail="The job has no skills, so skill_similarity_match cannot be used for it."
+        )
     except ValueError as e:
         _log(f"Validation Error: Missing filters for /job/{id}/recommendCandidates", format="error")
         _log(str(e), format="error")
@@ -113,6 +137,205 @@ async def _recommend_candidates(id: int,
         _log(f"Internal Server Error: /job/{id}/recommendCandidates", format="error")
         _log(str(e), format="error")
         _log(traceback.format_exc(), format="error")
+        raise HTTPException(
+            status_code=500,
+            detail="An unexpected error occurred. Please try again later."
+        )
+
+@router.get(
+    "/job/{id}/exportCandidates",
+    response_class=StreamingResponse,
+    summary="To export all Candidates matching a job based on the ID and filters provided, as NDJSON",
+    responses={
+        200: {
+            "content": {NDJSON_MEDIA_TYPE: {}},
+            "description": "One RecommendationResponse object per line"
+        },
+        500: {"description": "Internal Server Error"}, 
+        422: {"description": "Validation Error"}
+    }
+)
+async def _export_candidates(id: int,
+                     filters: Filters=Depends()) -> StreamingResponse:
+    """
+    Streams every Candidate matching the job ID and filters provided, not only the top ones
+
+    The matches are read from Elasticsearch page by page while the client
+    consumes the stream, so the memory use does not grow with the number of
+    matches. The lines come in no particular order. The skill_similarity_match
+    filter is ignored, since a kNN search only returns the nearest candidates.
+
+    Parameters
+    ----------
+    id : int
+        This is the job id from the ES index of jobs
+    filters : Filters
+       This is the filters object which contains the filters to be applied on the candidates
+       The filters included are 
+       1. seniority_match
+       2. salary_match
+       3. top_skills_match
+    
+    Returns
+    -------
+    StreamingResponse
+        NDJSON stream with one RecommendationResponse object per line.
+    """
+    try:
+        _log(f"GET /job/{id}/exportCandidates", format="info")
+        jobs_object: dict = jobs_index.get_entity(id=id)
+        should_queries: list[dict] = candidates_index.build_should_queries(entity_data=jobs_object, 
+                                                         filters_used=filters)
+        routing: Optional[str] = candidates_index.build_routing(entity_data=jobs_object,
+                                                          filters_used=filters)
+        pages = candidates_index.scan_with_bool_queries(should_queries=should_queries,
+                                                   routing=routing)
+        return StreamingResponse(
+            ndjson_recommendations(pages, endpoint=f"/job/{id}/exportCandidates"),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+    except ValueError as e:
+        _log(f"Validation Error: Missing filters for /job/{id}/exportCandidates", format="error")
+        _log(str(e), format="error")
+        _log(traceback.format_exc(), format="error")
+        raise HTTPException(
+            status_code=422,
+            detail="At least one of the filters (seniority_match, salary_match, top_skills_match) must be provided."
+        )
+    except Exception as e:
+        _log(f"Internal Server Error: /job/{id}/exportCandidates", format="error")
+        _log(str(e), format="error")
+        _log(traceback.format_exc(), format="error")
+        raise HTTPException(
+            status_code=500,
+            detail="An unexpected error occurred. Please try again later."
+        )
+
+@router.get(
+    "/job/{id}/recommendCandidates/summary",
+    response_model=MatchSummary,
+    summary="To count the Candidates matching a job per seniority, salary band and top skill based on the ID and filters provided",
+    responses={
+        200: {"model": MatchSummary}, 
+        500: {"description": "Internal Server Error"}, 
+        422: {"description": "Validation Error"}
+    }
+)
+async def _recommend_candidates_summary(id: int,
+                     filters: Filters=Depends()) -> JSONResponse:
+    """
+    Gets the number of Candidates matching the job ID and filters provided, without fetching them
+
+    The summaries are cached per job ID and filters until the candidates or
+    jobs index changes.
+
+    Parameters
+    ----------
+    id : int
+        This is the job id from the ES index of jobs
+    filters : Filters
+       This is the filters object which contains the filters to be applied on the candidates
+       The filters included are 
+       1. seniority_match
+       2. salary_match
+       3. top_skills_match
+    
+    Returns
+    -------
+    JSONResponse
+        JSON response containing the MatchSummary object.
+    """
+    try:
+        _log(f"GET /job/{id}/recommendCandidates/summary", format="info")
+
+        def summarize() -> MatchSummary:
+            jobs_object: dict = jobs_index.get_entity(id=id)
+            should_queries: list[dict] = candidates_index.build_should_queries(entity_data=jobs_object, 
+                                                             filters_used=filters)
+            routing: Optional[str] = candidates_index.build_routing(entity_data=jobs_object,
+                                                              filters_used=filters)
+            response = candidates_index.summarize_with_bool_queries(should_queries=should_queries,
+                                                              routing=routing)
+            return candidates_index.get_summary_type_output(response=response)
+
+        cache_key: tuple = (id, filters.top_skills_match, filters.seniority_match, filters.salary_match)
+        return summary_cache.get_or_compute(cache_key, summarize)
+    except ValueError as e:
+        _log(f"Validation Error: Missing filters for /job/{id}/recommendCandidates/summary", format="error")
+        _log(str(e), format="error")
+        _log(traceback.format_exc(), format="error")
+        raise HTTPException(
+            status_code=422,
+            detail="At least one of the filters (seniority_match, salary_match, top_skills_match) must be provided."
+        )
+    except Exception as e:
+        _log(f"Internal Server Error: /job/{id}/recommendCandidates/summary", format="error")
+        _log(str(e), format="error")
+        _log(traceback.format_exc(), format="error")
+        raise HTTPException(
+            status_code=500,
+            detail="An unexpected error occurred. Please try again later."
+        )
+
+@router.get(
+    "/job/{id}/reciprocalCandidates",
+    response_model=List[RecommendationResponse],
+    summary="To get the top Candidates that match a job and that the job matches in return, based on the ID and filters provided",
+    responses={
+        200: {"model": List[RecommendationResponse]}, 
+        500: {"description": "Internal Server Error"}, 
+        422: {"description": "Validation Error"}
+    }
+)
+async def _reciprocal_candidates(id: int,
+                     filters: Filters=Depends()) -> JSONResponse:
+    """
+    Gets the top Candidates that fit the job, and that the job fits in return
+
+    Both directions are checked in a single search: a candidate is returned if
+    it matches the job's criteria and the job matches the candidate's
+    criteria. The relevance score is the combined score of both directions.
+
+    Parameters
+    ----------
+    id : int
+        This is the job id from the ES index of jobs
+    filters : Filters
+       This is the filters object which contains the filters to be applied in both directions
+       The filters included are 
+       1. seniority_match
+       2. salary_match
+       3. top_skills_match
+    
+    Returns
+    -------
+    JSONResponse
+        JSON response containing the RecommendationResponse object.
+    """
+    try:
+        _log(f"GET /job/{id}/reciprocalCandidates", format="info")
+        jobs_object: dict = jobs_index.get_entity(id=id)
+        must_queries: list[dict] = candidates_index.build_reciprocal_must_queries(entity_data=jobs_object,
+                                                                      filters_used=filters)
+        routing: Optional[str] = candidates_index.build_routing(entity_data=jobs_object,
+                                                          filters_used=filters)
+        response = candidates_index.search_with_bool_queries(must_queries=must_queries,
+                                                       return_source=False,
+                                                       routing=routing)
+        final_response: List[RecommendationResponse] = candidates_index.get_recommendation_type_output(response=response)
+        return final_response
+    except ValueError as e:
+        _log(f"Validation Error: Missing filters for /job/{id}/reciprocalCandidates", format="error")
+        _log(str(e), format="error")
+        _log(traceback.format_exc(), format="error")
+        raise HTTPException(
+            status_code=422,
+            detail="At least one of the filters (seniority_match, salary_match, top_skills_match) must be provided."
+        )
+    except Exception as e:
+        _log(f"Internal Server Error: /job/{id}/reciprocalCandidates", format="error")
+        _log(str(e), format="error")
+        _log(traceback.format_exc(), format="error")
         raise HTTPException(
             status_code=500,
             detail="An unexpected error occurred. Please try again later."
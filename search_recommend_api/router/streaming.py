@@ -0,0 +1,48 @@
+"""
+Helpers for streaming recommendation exports as newline delimited JSON (NDJSON).
+"""
+
+import json
+import traceback
+from typing import Iterator
+
+from search_recommend_api.logger import _log
+
+NDJSON_MEDIA_TYPE: str = "application/x-ndjson"
+
+
+def ndjson_recommendations(pages: Iterator[list[dict]], endpoint: str) -> Iterator[str]:
+    """
+    Encodes pages of Elasticsearch hits as NDJSON, one chunk per page.
+
+    Every line has the fields of a RecommendationResponse. The response status
+    is already sent once streaming starts, so errors are logged and re-raised.
+    The server then aborts the chunked response without its terminating chunk,
+    and the client sees a failed transfer instead of a complete but truncated
+    200 body.
+
+    Parameters
+    ----------
+    pages : Iterator[list[dict]]
+        The pages of hits, e.g. from `ElasticsearchClient.scan_with_bool_queries`.
+    endpoint : str
+        The endpoint that is exporting, used for logging.
+
+    Returns
+    -------
+    Iterator[str]
+        The NDJSON chunks.
+    """
+    try:
+        for hits in pages:
+            yield "".join(
+                json.dumps({"id": int(hit["_id"]), "relevance_score": hit["_score"]}) + "\n"
+                for hit in hits
+            )
+    except Exception as e:
+        _log(f"Internal Server Error while streaming: {endpoint}", format="error")
+        _log(str(e), format="error")
+        _log(traceback.format_exc(), format="error")
+        raise
+    finally:
+        pages.close()
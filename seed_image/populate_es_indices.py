@@ -6,6 +6,9 @@ import os
 from pathlib import Path
 from elasticsearch import Elasticsearch
 from elasticsearch.helpers import bulk
+from skill_dictionary import SkillDictionary
+from skill_vectors import SkillVectors
+from snapshot_writer import write_snapshot
 
 _LOGGER = logging.getLogger("python_developer_test")
 logging.basicConfig(
@@ -27,43 +30,138 @@ def read_yaml(file_path):
         return yaml.full_load(file_pointer)
 
 
+def merge_config(base: dict, override: dict) -> dict:
+    """
+    Recursively merges an override config into a copy of the base config.
+
+    Args:
+        base (dict): The base config, e.g. the default index settings.
+        override (dict): The values to add or replace.
+
+    Returns:
+        dict: The merged config.
+    """
+    merged = dict(base)
+    for key, value in (override or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
 ES_URL = os.getenv("ES_URL")
+ES_INDEX_PROFILE = os.getenv("ES_INDEX_PROFILE", "default")
 
 ES_CONFIG_PATH = Path(__file__).parent / "es_config"
 DATA_PATH = Path(__file__).parent / "data"
+SNAPSHOT_PATH = Path(os.getenv("SNAPSHOT_PATH") or DATA_PATH / "snapshot")
+
+
+def read_profile(profile_name: str) -> dict:
+    """
+    Reads an index profile from `es_config/profiles`.
+
+    A profile overrides the default settings and mappings. Its optional
+    top-level `settings` apply to every index, while the sections named after
+    an index (e.g. `jobs`) can override that index's `settings` and `mappings`.
+
+    Args:
+        profile_name (str): Name of the profile, "default" for no overrides.
+
+    Returns:
+        dict: The profile overrides.
+    """
+    if profile_name == "default":
+        return {}
+    return read_yaml(ES_CONFIG_PATH / "profiles" / (profile_name + ".yml")) or {}
+
+
+def index_setup(
+    *,
+    es_client: Elasticsearch,
+    index_name: str,
+    index_settings: dict,
+    profile: dict = None,
+) -> dict:
+    """
+    Re-creates an index with its mapping, merged with the profile overrides.
 
+    Args:
+        index_name (str): Name of the index, e.g. candidates or jobs.
+        index_settings (dict): The default index settings.
+        profile (dict): The profile overrides, see `read_profile`.
 
-def index_setup(*, es_client: Elasticsearch, index_name: str, index_settings: dict):
+    Returns:
+        dict: The mapping the index was created with.
+    """
     if es_client.indices.exists(index=index_name):
         es_client.indices.delete(index=index_name)
 
     index_mapping = read_yaml(ES_CONFIG_PATH / ("mappings_" + index_name + ".yml"))
+    if profile:
+        index_profile = profile.get(index_name) or {}
+        index_settings = merge_config(index_settings, profile.get("settings"))
+        index_settings = merge_config(index_settings, index_profile.get("settings"))
+        index_mapping = merge_config(index_mapping, index_profile.get("mappings"))
 
     es_client.indices.create(
         index=index_name, mappings=index_mapping, settings=index_settings
     )
     _LOGGER.info(f"Successfully created index {index_name}.")
-
-
-def populate(*, es_client: Elasticsearch, index_name: str) -> None:
+    return index_mapping
+
+
+def populate(
+    *,
+    es_client: Elasticsearch,
+    index_name: str,
+    skill_dictionary: SkillDictionary,
+    skill_vectors: SkillVectors = None,
+    actions: list[dict] = None,
+    chunk_size: int = 50,
+    routing_field: str = None,
+) -> list[dict]:
     """
     Populates indices defined in config by inserting all actions.
 
     Args:
         index_name (str): Name of index to populate, e.g. candidates or jobs.
+        skill_dictionary (SkillDictionary): Dictionary used to add the canonical
+            `top_skill_ids` and `other_skill_ids` to every document.
+        skill_vectors (SkillVectors): Encoder used to add the `skill_vector`
+            to every document with skills.
+        actions (list[dict]): Bulk actions to insert, defaults to the ones in
+            `data/<index_name>.json`.
+        chunk_size (int): Number of documents per bulk request.
+        routing_field (str): Field whose lowercased value routes each document
+            to its shard, e.g. seniority. Documents use the default routing by
+            ID if not given.
+
+    Returns:
+        list[dict]: The inserted actions, with the skill IDs and vectors added.
 
     Raises:
         IndexPopulationError: If errors occur in bulk insertion.
     """
 
-    with open(DATA_PATH / (index_name + ".json")) as file_pointer:
-        actions = json.load(file_pointer)
+    if actions is None:
+        with open(DATA_PATH / (index_name + ".json")) as file_pointer:
+            actions = json.load(file_pointer)
+    for action in actions:
+        skill_dictionary.add_skill_ids(action["_source"])
+        skill_vector = skill_vectors and skill_vectors.vector_for(action["_source"])
+        if skill_vector:
+            action["_source"]["skill_vector"] = skill_vector
+        if routing_field:
+            # A missing value is routed like the "none" seniority, it never matches a seniority query
+            action["_routing"] = str(action["_source"].get(routing_field)).lower()
 
     _, errors = bulk(
         client=es_client,
         actions=actions,
         index=index_name,
-        chunk_size=50,
+        chunk_size=chunk_size,
         raise_on_error=False,
         refresh=True,
     )
@@ -71,20 +169,54 @@ def populate(*, es_client: Elasticsearch, index_name: str) -> None:
         raise IndexPopulationError(f"failed to index some documents: {errors}.")
 
     _LOGGER.info(f"Successfully populated index {index_name}.")
+    return actions
 
 
 if __name__ == "__main__":
-    es_client = Elasticsearch(ES_URL)
+    # ES_URL may list several comma separated nodes
+    es_client = Elasticsearch(ES_URL.split(","))
     es_client.cluster.put_settings(
         persistent=read_yaml(ES_CONFIG_PATH / "cluster_settings.yml")["persistent"]
     )
 
     index_settings = read_yaml(ES_CONFIG_PATH / "index_settings.yml")
+    profile = read_profile(ES_INDEX_PROFILE)
+    _LOGGER.info(f"Using index profile {ES_INDEX_PROFILE}.")
+    skill_dictionary = SkillDictionary.from_data(DATA_PATH)
+    _LOGGER.info(f"Built skill dictionary with {len(skill_dictionary)} skills.")
+    skill_vectors = SkillVectors.from_data(skill_dictionary, DATA_PATH)
+
+    jobs_mapping = index_setup(
+        es_client=es_client,
+        index_name="jobs",
+        index_settings=index_settings,
+        profile=profile,
+    )
+    jobs_actions = populate(
+        es_client=es_client,
+        index_name="jobs",
+        skill_dictionary=skill_dictionary,
+        skill_vectors=skill_vectors,
+        routing_field=jobs_mapping.get("_meta", {}).get("routing_field"),
+    )
 
-    index_setup(es_client=es_client, index_name="jobs", index_settings=index_settings)
-    populate(es_client=es_client, index_name="jobs")
+    candidates_mapping = index_setup(
+        es_client=es_client,
+        index_name="candidates",
+        index_settings=index_settings,
+        profile=profile,
+    )
+    candidates_actions = populate(
+        es_client=es_client,
+        index_name="candidates",
+        skill_dictionary=skill_dictionary,
+        skill_vectors=skill_vectors,
+        routing_field=candidates_mapping.get("_meta", {}).get("routing_field"),
+    )
 
-    index_setup(
-        es_client=es_client, index_name="candidates", index_settings=index_settings
+    write_snapshot(
+        path=SNAPSHOT_PATH,
+        actions={"candidates": candidates_actions, "jobs": jobs_actions},
+        skill_dictionary=skill_dictionary,
     )
-    populate(es_client=es_client, index_name="candidates")
+    _LOGGER.info(f"Successfully wrote snapshot to {SNAPSHOT_PATH}.")
@@ -0,0 +1,284 @@
+"""
+Canonical skill dictionary used to normalize free-text skills into compact
+integer IDs.
+
+The dictionary is built from the seed data in `data/` together with the
+synonym groups in `es_config/skill_synonyms.yml`. Skills are first grouped by
+a spelling-insensitive key (case, whitespace, dots, dashes and underscores are
+ignored) and then merged with their synonyms. Each group receives an integer ID,
+with the most frequent skills getting the smallest IDs.
+
+Run this module directly to print a report comparing the raw keyword matching
+with the ID based matching on the seed data. If `ES_URL` is set, the report
+also compares the store size of the skill fields indexed as free text with
+the skill IDs next to the non-indexed free text, as in the index mappings.
+"""
+
+from collections import Counter
+import json
+import os
+import re
+from pathlib import Path
+from typing import Iterable
+
+import yaml
+
+DATA_PATH = Path(__file__).parent / "data"
+SKILL_SYNONYMS_PATH = Path(__file__).parent / "es_config" / "skill_synonyms.yml"
+SKILL_FIELDS = ("top_skills", "other_skills")
+SKILL_ID_FIELDS = {"top_skills": "top_skill_ids", "other_skills": "other_skill_ids"}
+
+_SEPARATORS = re.compile(r"[\s.\-_]+")
+
+# Skill fields before the skill IDs and as in the current index mappings
+_RAW_SKILL_MAPPING = {"type": "keyword", "normalizer": "lowercase"}
+SKILL_FIELD_MAPPINGS = {
+    "raw": {field: _RAW_SKILL_MAPPING for field in SKILL_FIELDS},
+    "ids": {
+        "top_skills": {"type": "keyword", "normalizer": "lowercase", "index": False},
+        "other_skills": {"type": "keyword", "index": False, "doc_values": False},
+        **{id_field: {"type": "keyword"} for id_field in SKILL_ID_FIELDS.values()},
+    },
+}
+
+
+def skill_key(skill: str) -> str:
+    """
+    Returns the spelling-insensitive lookup key of a skill.
+
+    Args:
+        skill (str): The free-text skill, e.g. "Node.js".
+
+    Returns:
+        str: The lookup key, e.g. "nodejs".
+    """
+    return _SEPARATORS.sub("", skill.lower())
+
+
+class SkillDictionary:
+    """
+    Maps free-text skills to canonical integer IDs.
+
+    Args:
+        names (list[str]): Canonical skill names, indexed by skill ID.
+        ids_by_key (dict[str, int]): Skill ID for every known lookup key.
+    """
+
+    def __init__(self, names: list[str], ids_by_key: dict[str, int]) -> None:
+        self.names = names
+        self.ids_by_key = ids_by_key
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def build(
+        cls, *, documents: Iterable[dict], synonyms: dict[str, list[str]]
+    ) -> "SkillDictionary":
+        """
+        Builds the dictionary from documents and synonym groups.
+
+        Args:
+            documents (Iterable[dict]): Document sources containing skill fields.
+            synonyms (dict[str, list[str]]): Canonical name -> list of synonyms.
+
+        Returns:
+            SkillDictionary: The dictionary covering every skill of the documents.
+        """
+        frequencies: Counter = Counter()
+        for document in documents:
+            for field in SKILL_FIELDS:
+                frequencies.update(document.get(field) or [])
+
+        # Union every lookup key with the key of its canonical name
+        canonical_key: dict[str, str] = {}
+        for canonical, aliases in (synonyms or {}).items():
+            for alias in [canonical, *aliases]:
+                canonical_key[skill_key(alias)] = skill_key(canonical)
+
+        group_frequencies: Counter = Counter()
+        surface_forms: dict[str, Counter] = {}
+        for skill, count in frequencies.items():
+            key = skill_key(skill)
+            group = canonical_key.get(key, key)
+            group_frequencies[group] += count
+            surface_forms.setdefault(group, Counter())[skill] += count
+        canonical_names = {skill_key(name): name for name in (synonyms or {})}
+
+        groups = sorted(group_frequencies, key=lambda g: (-group_frequencies[g], g))
+        group_ids = {group: skill_id for skill_id, group in enumerate(groups)}
+        names = [
+            canonical_names.get(group) or surface_forms[group].most_common(1)[0][0]
+            for group in groups
+        ]
+        ids_by_key = {
+            key: group_ids[group]
+            for key, group in canonical_key.items()
+            if group in group_ids
+        }
+        ids_by_key.update({group: skill_id for group, skill_id in group_ids.items()})
+        return cls(names, ids_by_key)
+
+    @classmethod
+    def from_data(
+        cls,
+        data_path: Path = DATA_PATH,
+        synonyms_path: Path = SKILL_SYNONYMS_PATH,
+    ) -> "SkillDictionary":
+        """
+        Builds the dictionary from the seed data files and the synonym config.
+
+        Args:
+            data_path (Path): Folder containing `candidates.json` and `jobs.json`.
+            synonyms_path (Path): YAML file with the synonym groups.
+
+        Returns:
+            SkillDictionary: The dictionary covering every skill of the seed data.
+        """
+        documents = []
+        for index_name in ("candidates", "jobs"):
+            with open(data_path / (index_name + ".json")) as file_pointer:
+                documents.extend(action["_source"] for action in json.load(file_pointer))
+        with open(file=synonyms_path, encoding="utf-8", mode="r") as file_pointer:
+            synonyms = yaml.full_load(file_pointer)
+        return cls.build(documents=documents, synonyms=synonyms)
+
+    def ids_for(self, skills: Iterable[str]) -> list[int]:
+        """
+        Returns the de-duplicated skill IDs of the given skills, in input order.
+
+        Args:
+            skills (Iterable[str]): Free-text skills.
+
+        Returns:
+            list[int]: The skill IDs.
+
+        Raises:
+            KeyError: If a skill is not part of the dictionary.
+        """
+        return list(dict.fromkeys(self.ids_by_key[skill_key(skill)] for skill in skills))
+
+    def add_skill_ids(self, document: dict) -> dict:
+        """
+        Adds `top_skill_ids` and `other_skill_ids` to a document source in place.
+
+        Args:
+            document (dict): The document source.
+
+        Returns:
+            dict: The same document source.
+        """
+        for field, id_field in SKILL_ID_FIELDS.items():
+            document[id_field] = self.ids_for(document.get(field) or [])
+        return document
+
+
+def _top_skills_matches(query_skills: list, document_skills: list) -> bool:
+    """
+    Mirrors the `terms_set` top skills criterion of the recommendation API.
+    """
+    if not query_skills:
+        return False
+    return len(set(query_skills) & set(document_skills)) >= min(len(query_skills), 2)
+
+
+def report(dictionary: SkillDictionary, data_path: Path = DATA_PATH) -> dict:
+    """
+    Compares raw keyword matching with skill ID matching on the seed data.
+
+    Args:
+        dictionary (SkillDictionary): The skill dictionary.
+        data_path (Path): Folder containing `candidates.json` and `jobs.json`.
+
+    Returns:
+        dict: Term counts, average top skills query size in bytes and the
+        average number of top skills matches per recommendation query.
+    """
+    data = {}
+    for index_name in ("candidates", "jobs"):
+        with open(data_path / (index_name + ".json")) as file_pointer:
+            data[index_name] = [action["_source"] for action in json.load(file_pointer)]
+    documents = data["candidates"] + data["jobs"]
+
+    raw_terms = {skill.lower() for d in documents for f in SKILL_FIELDS for skill in d[f]}
+    raw_top = {i: [[s.lower() for s in d["top_skills"]] for d in docs] for i, docs in data.items()}
+    id_top = {i: [dictionary.ids_for(d["top_skills"]) for d in docs] for i, docs in data.items()}
+
+    def query_bytes(terms: list) -> int:
+        return len(json.dumps({"terms_set": {"top_skills": {"terms": terms}}}))
+
+    result = {"raw_terms": len(raw_terms), "skill_ids": len(dictionary)}
+    for label, top in (("raw", raw_top), ("ids", id_top)):
+        queries = top["candidates"] + top["jobs"]
+        result[f"{label}_query_bytes"] = sum(map(query_bytes, queries)) / len(queries)
+        matches = [
+            sum(_top_skills_matches(query, document) for document in top[target])
+            for source, target in (("candidates", "jobs"), ("jobs", "candidates"))
+            for query in top[source]
+        ]
+        result[f"{label}_matches_per_query"] = sum(matches) / len(matches)
+    return result
+
+
+def store_sizes(dictionary: SkillDictionary, es_url: str, data_path: Path = DATA_PATH) -> dict:
+    """
+    Measures the store size of the skill fields of the seed data, once per
+    mapping in `SKILL_FIELD_MAPPINGS`.
+
+    Every variant is written to a temporary single shard index without
+    replicas, force merged to one segment and deleted afterwards.
+
+    Args:
+        dictionary (SkillDictionary): The skill dictionary.
+        es_url (str): The Elasticsearch URL, e.g. "http://localhost:9200".
+        data_path (Path): Folder containing `candidates.json` and `jobs.json`.
+
+    Returns:
+        dict: The primary store size in bytes per variant, as reported by
+        `_cat/indices`.
+    """
+    from elasticsearch import Elasticsearch, helpers
+
+    documents = []
+    for index_name in ("candidates", "jobs"):
+        with open(data_path / (index_name + ".json")) as file_pointer:
+            documents += [action["_source"] for action in json.load(file_pointer)]
+
+    es_client = Elasticsearch(es_url.split(",")[0])
+    sizes = {}
+    for variant, properties in SKILL_FIELD_MAPPINGS.items():
+        index_name = f"skill-store-size-{variant}"
+        es_client.options(ignore_status=404).indices.delete(index=index_name)
+        es_client.indices.create(
+            index=index_name,
+            settings={
+                "number_of_shards": 1,
+                "number_of_replicas": 0,
+                "analysis": {"normalizer": {"lowercase": {"type": "custom", "filter": ["lowercase"]}}},
+            },
+            mappings={"dynamic": "strict", "properties": properties},
+        )
+        try:
+            helpers.bulk(
+                es_client,
+                (
+                    {"_index": index_name, "_source": {field: document.get(field) for field in properties}}
+                    for document in map(dictionary.add_skill_ids, documents)
+                ),
+            )
+            es_client.indices.forcemerge(index=index_name, max_num_segments=1)
+            es_client.indices.refresh(index=index_name)
+            stats = es_client.cat.indices(index=index_name, format="json", bytes="b", h="pri.store.size")
+            sizes[f"{variant}_store_bytes"] = int(stats[0]["pri.store.size"])
+        finally:
+            es_client.indices.delete(index=index_name)
+    return sizes
+
+
+if __name__ == "__main__":
+    skill_dictionary = SkillDictionary.from_data()
+    results = report(skill_dictionary)
+    if os.getenv("ES_URL"):
+        results.update(store_sizes(skill_dictionary, os.environ["ES_URL"]))
+    for name, value in results.items():
+        print(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}")
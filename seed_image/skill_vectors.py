@@ -0,0 +1,119 @@
+"""
+Skill embeddings used by the skill similarity recommendations.
+
+Every canonical skill of the `SkillDictionary` is embedded from the skill
+co-occurrence in the seed data: skills listed together on the same candidate
+or job are related. The positive pointwise mutual information (PPMI) of the
+co-occurrence counts is factorized into `SKILL_VECTOR_DIMS` dimensions.
+
+A document is encoded as the normalized, weighted mean of its skill vectors,
+top skills weighing twice as much as other skills. The seeding script stores
+this vector in the `skill_vector` dense_vector field.
+"""
+
+import json
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from skill_dictionary import DATA_PATH, SKILL_FIELDS, SkillDictionary
+
+SKILL_VECTOR_DIMS = 32
+SKILL_WEIGHTS = {"top_skill_ids": 1.0, "other_skill_ids": 0.5}
+
+
+class SkillVectors:
+    """
+    Encodes documents into fixed-size skill vectors.
+
+    Args:
+        skill_dictionary (SkillDictionary): Dictionary mapping skills to IDs.
+        embeddings (np.ndarray): Skill vectors, one row per skill ID.
+    """
+
+    def __init__(self, skill_dictionary: SkillDictionary, embeddings: np.ndarray) -> None:
+        self.skill_dictionary = skill_dictionary
+        self.embeddings = embeddings
+
+    @classmethod
+    def build(
+        cls,
+        *,
+        documents: Iterable[dict],
+        skill_dictionary: SkillDictionary,
+        dims: int = SKILL_VECTOR_DIMS,
+    ) -> "SkillVectors":
+        """
+        Builds the skill embeddings from the co-occurrence in the documents.
+
+        Args:
+            documents (Iterable[dict]): Document sources containing skill fields.
+            skill_dictionary (SkillDictionary): Dictionary mapping skills to IDs.
+            dims (int): Number of dimensions of the vectors.
+
+        Returns:
+            SkillVectors: The encoder.
+        """
+        n_skills = len(skill_dictionary)
+        cooccurrence = np.zeros((n_skills, n_skills), dtype=np.float64)
+        for document in documents:
+            skill_ids = skill_dictionary.ids_for(
+                [skill for field in SKILL_FIELDS for skill in document.get(field) or []]
+            )
+            cooccurrence[np.ix_(skill_ids, skill_ids)] += 1.0
+        np.fill_diagonal(cooccurrence, 0.0)
+
+        total = cooccurrence.sum()
+        marginals = cooccurrence.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pmi = np.log(cooccurrence * total / np.outer(marginals, marginals))
+        ppmi = np.where(np.isfinite(pmi) & (pmi > 0), pmi, 0.0)
+
+        # PPMI is symmetric, so its top eigenvectors give the truncated SVD
+        eigenvalues, eigenvectors = np.linalg.eigh(ppmi)
+        top = np.argsort(eigenvalues)[::-1][:dims]
+        embeddings = eigenvectors[:, top] * np.sqrt(np.clip(eigenvalues[top], 0.0, None))
+        return cls(skill_dictionary, embeddings.astype(np.float32))
+
+    @classmethod
+    def from_data(
+        cls, skill_dictionary: SkillDictionary, data_path: Path = DATA_PATH
+    ) -> "SkillVectors":
+        """
+        Builds the skill embeddings from the seed data files.
+
+        Args:
+            skill_dictionary (SkillDictionary): Dictionary mapping skills to IDs.
+            data_path (Path): Folder containing `candidates.json` and `jobs.json`.
+
+        Returns:
+            SkillVectors: The encoder.
+        """
+        documents = []
+        for index_name in ("candidates", "jobs"):
+            with open(data_path / (index_name + ".json")) as file_pointer:
+                documents.extend(action["_source"] for action in json.load(file_pointer))
+        return cls.build(documents=documents, skill_dictionary=skill_dictionary)
+
+    def vector_for(self, document: dict) -> Optional[list[float]]:
+        """
+        Returns the skill vector of a document source.
+
+        Args:
+            document (dict): The document source, with skill IDs added by
+                `SkillDictionary.add_skill_ids`.
+
+        Returns:
+            Optional[list[float]]: The unit length vector, None if the document
+            has no skills with co-occurrence data.
+        """
+        vector = np.zeros(self.embeddings.shape[1], dtype=np.float64)
+        for field, weight in SKILL_WEIGHTS.items():
+            skill_ids = document.get(field) or []
+            if skill_ids:
+                vector += weight * self.embeddings[skill_ids].sum(axis=0)
+        norm = np.linalg.norm(vector)
+        if norm == 0.0:
+            return None
+        return (vector / norm).round(6).tolist()
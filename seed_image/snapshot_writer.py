@@ -0,0 +1,174 @@
+"""
+Binary snapshot of the seeded indices, written next to the Elasticsearch load.
+
+The snapshot is a directory of `.npy` files that `es_lib.snapshot` memory-maps
+without copying, so in-process consumers (tests, offline matching, warm-up)
+do not have to re-parse the JSON seed data or scroll the indices. Every
+snapshot is written into a fresh generation directory, and the `current`
+symlink points at the latest complete one:
+
+    current                        symlink to the latest generation directory
+    <generation>/...               one complete snapshot, laid out as follows
+
+    meta.json                      format version, seniority levels, counts
+    skill_names.npy                uint8, UTF-8 bytes of all canonical skill names
+    skill_names.offsets.npy        int64, start of every name in skill_names.npy, plus the end
+    <index>/ids.npy                int64, document IDs in ascending order
+    <index>/salaries.npy           float64, salary_expectation or max_salary, NaN if missing
+    <index>/seniorities.npy        candidates: int8 position in SENIORITY_LEVELS, -1 if missing
+                                   jobs: uint8 bit mask of the positions in SENIORITY_LEVELS
+    <index>/<field>.npy            int32, skill IDs of all documents, concatenated
+    <index>/<field>.indptr.npy     int64, start of every document in <field>.npy, plus the end
+
+with <field> being `top_skill_ids` and `other_skill_ids`. Row i of every array
+of an index belongs to the document `ids[i]`.
+
+The `current` symlink is only replaced, atomically, once every file of the
+new generation is written. A reader resolves it once and then opens all files
+of the same generation, so it never mixes the arrays of two snapshots.
+Generations older than the previous one are deleted. Processes that mapped
+them keep reading their pages until they reload.
+"""
+
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from skill_dictionary import SKILL_ID_FIELDS, SkillDictionary
+
+SNAPSHOT_FORMAT_VERSION = 1
+SENIORITY_LEVELS = ("none", "junior", "midlevel", "senior")
+SALARY_FIELDS = {"candidates": "salary_expectation", "jobs": "max_salary"}
+SENIORITY_FIELDS = {"candidates": "seniority", "jobs": "seniorities"}
+CURRENT_LINK = "current"
+GENERATION_PREFIX = "generation-"
+
+
+def _save(path: Path, array: np.ndarray) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as file_pointer:
+        np.save(file_pointer, array)
+
+
+def _swap_current(path: Path, generation: str) -> None:
+    """
+    Points the `current` symlink at a generation and deletes the generations
+    older than the previous one.
+    """
+    current = path / CURRENT_LINK
+    previous = os.readlink(current) if current.is_symlink() else None
+    temporary_link = path / (CURRENT_LINK + ".tmp")
+    if temporary_link.is_symlink():
+        temporary_link.unlink()
+    os.symlink(generation, temporary_link)
+    os.replace(temporary_link, current)
+
+    for directory in path.glob(GENERATION_PREFIX + "*"):
+        if directory.name not in (generation, previous):
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def _offsets(lengths: Iterable[int]) -> np.ndarray:
+    """
+    Returns the CSR style start offsets for the given lengths, plus the end.
+    """
+    return np.concatenate(([0], np.cumsum(np.fromiter(lengths, dtype=np.int64))))
+
+
+def _seniority_code(seniority: str) -> int:
+    return SENIORITY_LEVELS.index(seniority) if seniority in SENIORITY_LEVELS else -1
+
+
+def index_arrays(index_name: str, actions: list[dict]) -> dict[str, np.ndarray]:
+    """
+    Converts the bulk actions of an index into the snapshot arrays.
+
+    Args:
+        index_name (str): Name of the index, e.g. candidates or jobs.
+        actions (list[dict]): Bulk actions with skill IDs added by
+            `SkillDictionary.add_skill_ids`.
+
+    Returns:
+        dict[str, np.ndarray]: The arrays by file name, without `.npy`.
+    """
+    actions = sorted(actions, key=lambda action: int(action["_id"]))
+    sources = [action["_source"] for action in actions]
+    salaries = [source.get(SALARY_FIELDS[index_name]) for source in sources]
+
+    arrays = {
+        "ids": np.array([int(action["_id"]) for action in actions], dtype=np.int64),
+        "salaries": np.array([np.nan if s is None else s for s in salaries], dtype=np.float64),
+    }
+    if index_name == "candidates":
+        arrays["seniorities"] = np.array(
+            [_seniority_code(source.get("seniority")) for source in sources], dtype=np.int8
+        )
+    else:  # jobs
+        arrays["seniorities"] = np.array(
+            [
+                sum(1 << code for code in map(_seniority_code, source.get("seniorities") or []) if code >= 0)
+                for source in sources
+            ],
+            dtype=np.uint8,
+        )
+    for id_field in SKILL_ID_FIELDS.values():
+        skill_ids = [source.get(id_field) or [] for source in sources]
+        arrays[id_field] = np.fromiter(
+            (skill_id for ids in skill_ids for skill_id in ids), dtype=np.int32
+        )
+        arrays[id_field + ".indptr"] = _offsets(map(len, skill_ids))
+    return arrays
+
+
+def write_snapshot(
+    *,
+    path: Path,
+    actions: dict[str, list[dict]],
+    skill_dictionary: SkillDictionary,
+) -> Path:
+    """
+    Writes the snapshot of the given indices as a new generation and makes it
+    the current one.
+
+    Args:
+        path (Path): The snapshot directory, created if missing.
+        actions (dict[str, list[dict]]): The indexed bulk actions per index name.
+        skill_dictionary (SkillDictionary): Dictionary that added the skill IDs.
+
+    Returns:
+        Path: The directory of the written generation.
+    """
+    generation = f"{GENERATION_PREFIX}{time.time_ns()}"
+    generation_path = path / generation
+    generation_path.mkdir(parents=True)
+
+    names = [name.encode("utf-8") for name in skill_dictionary.names]
+    _save(generation_path / "skill_names.npy", np.frombuffer(b"".join(names), dtype=np.uint8))
+    _save(generation_path / "skill_names.offsets.npy", _offsets(map(len, names)))
+
+    meta = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "generation": generation,
+        "seniority_levels": list(SENIORITY_LEVELS),
+        "skills": len(names),
+        "indices": {},
+    }
+    for index_name, index_actions in actions.items():
+        arrays = index_arrays(index_name, index_actions)
+        for file_name, array in arrays.items():
+            _save(generation_path / index_name / (file_name + ".npy"), array)
+        meta["indices"][index_name] = {
+            "documents": len(arrays["ids"]),
+            "salary_field": SALARY_FIELDS[index_name],
+            "seniority_field": SENIORITY_FIELDS[index_name],
+        }
+
+    with open(generation_path / "meta.json", "w", encoding="utf-8") as file_pointer:
+        json.dump(meta, file_pointer, indent=2)
+    _swap_current(path, generation)
+    return generation_path
@@ -2,10 +2,16 @@ import pytest
 from fastapi.testclient import TestClient
 from pydantic import ValidationError
 
+from elasticsearch.exceptions import ConnectionError
+
+from es_lib import ElasticsearchClient
+from es_lib.snapshot import SNAPSHOT_PATH, Snapshot
 from search_recommend_api.main import app  
 from search_recommend_api.model.candidate import Candidate
 from search_recommend_api.model.job import Job
 from search_recommend_api.model.recommendation_response import RecommendationResponse
+from search_recommend_api.model.match_summary import MatchSummary
+from search_recommend_api.router.streaming import ndjson_recommendations
 
 client = TestClient(app)
 
@@ -61,4 +67,109 @@ def test_recommend_jobs_endpoint():
         output = RecommendationResponse(**output_data[0])
         assert output is not None
     except ValidationError as e:
-        pytest.fail(f"Output data validation failed: {e}")
\ No newline at end of file
+        pytest.fail(f"Output data validation failed: {e}")
+
+def test_recommend_jobs_skill_similarity_endpoint():
+    response = client.get("/candidate/1/recommendJobs?skill_similarity_match=true&salary_match=true")
+    assert response.status_code == 200
+    
+    # Check if the response JSON can be parsed into a RecommendationResponse model
+    output_data = response.json()
+    try:
+        assert isinstance(output_data, list)
+        output = RecommendationResponse(**output_data[0])
+        assert output is not None
+    except ValidationError as e:
+        pytest.fail(f"Output data validation failed: {e}")
+
+def test_recommend_jobs_skill_similarity_without_skills():
+    # Candidate 52 has neither top nor other skills in the seed data
+    response = client.get("/candidate/52/recommendJobs?skill_similarity_match=true")
+    assert response.status_code == 422
+    assert "skill_similarity_match" in response.json()["detail"]
+
+def test_export_candidates_endpoint():
+    response = client.get("/job/1/exportCandidates?top_skills_match=true&seniority_match=true&salary_match=true")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    
+    # Check if every NDJSON line can be parsed into a RecommendationResponse model
+    lines = response.text.splitlines()
+    try:
+        assert len(lines) > 0
+        for line in lines:
+            output = RecommendationResponse.model_validate_json(line)
+            assert output is not None
+    except ValidationError as e:
+        pytest.fail(f"Output data validation failed: {e}")
+
+class UnreachableExportNode:
+    """
+    Stub node whose point in time cannot be opened.
+    """
+
+    class indices:
+        @staticmethod
+        def get(index, **kwargs):
+            return {index: {"settings": {"index": {"uuid": "stub"}}}}
+
+    def get_source(self, **kwargs):
+        return {"seniorities": ["junior"], "max_salary": 60000, "top_skills": ["Python"], "top_skill_ids": ["1"]}
+
+    def open_point_in_time(self, **kwargs):
+        raise ConnectionError("connection refused")
+
+def test_export_pit_error_returns_500(monkeypatch):
+    monkeypatch.setattr(ElasticsearchClient, "_ElasticsearchClient__client", UnreachableExportNode())
+    monkeypatch.setattr(ElasticsearchClient, "_ElasticsearchClient__routing_fields", {})
+
+    response = client.get("/job/1/exportCandidates?seniority_match=true")
+    assert response.status_code == 500
+
+def test_export_error_aborts_stream():
+    def pages():
+        yield [{"_id": "1", "_score": 1.0}]
+        raise RuntimeError("search failed")
+
+    # The error must reach the server, which then aborts the chunked response
+    chunks = ndjson_recommendations(pages(), "/job/1/exportCandidates")
+    assert next(chunks) == '{"id": 1, "relevance_score": 1.0}\n'
+    with pytest.raises(RuntimeError):
+        next(chunks)
+
+def test_recommend_jobs_summary_endpoint():
+    response = client.get("/candidate/1/recommendJobs/summary?top_skills_match=true&seniority_match=true&salary_match=true")
+    assert response.status_code == 200
+    
+    # Check if the response JSON can be parsed into a MatchSummary model
+    summary_data = response.json()
+    try:
+        summary = MatchSummary(**summary_data)
+        assert summary.total >= sum(bucket.count for bucket in summary.salary)
+    except ValidationError as e:
+        pytest.fail(f"Summary data validation failed: {e}")
+
+def test_reciprocal_jobs_endpoint():
+    response = client.get("/candidate/1/reciprocalJobs?top_skills_match=true&seniority_match=true&salary_match=true")
+    assert response.status_code == 200
+    
+    # Check if the response JSON can be parsed into a RecommendationResponse model
+    output_data = response.json()
+    try:
+        assert isinstance(output_data, list)
+        output = RecommendationResponse(**output_data[0])
+        assert output is not None
+    except ValidationError as e:
+        pytest.fail(f"Output data validation failed: {e}")
+
+@pytest.mark.skipif(not SNAPSHOT_PATH, reason="SNAPSHOT_PATH is not set")
+def test_snapshot_matches_index():
+    response = client.get("/candidate/1")
+    assert response.status_code == 200
+    
+    # Check if the snapshot holds the same candidate as the index
+    candidate_data = response.json()
+    snapshot_data = Snapshot.load().candidates.get_entity(id=1)
+    assert snapshot_data["seniority"] == candidate_data["seniority"]
+    assert snapshot_data["salary_expectation"] == candidate_data["salary_expectation"]
+    assert type(snapshot_data["salary_expectation"]) is type(candidate_data["salary_expectation"])
\ No newline at end of file
@@ -0,0 +1,146 @@
+import threading
+from concurrent.futures import ALL_COMPLETED, wait
+
+import pytest
+from elasticsearch.exceptions import ConnectionError
+
+from es_lib import hedging
+from es_lib.hedging import HedgedClient, read_kind
+
+
+class StubNode:
+    """
+    Stub node answering reads once its gate is set, immediately without one.
+    A node may set the gate of another node when it is called.
+    """
+
+    def __init__(self, name, gate=None, error=None, releases=None):
+        self.name = name
+        self.gate = gate
+        self.error = error
+        self.releases = releases
+        self.calls = 0
+
+    def search(self, **kwargs):
+        self.calls += 1
+        if self.releases:
+            self.releases.set()
+        if self.gate:
+            self.gate.wait()
+        if self.error:
+            raise self.error
+        return {"node": self.name}
+
+    get_source = search
+
+
+def prefill(client, *, ewma, latency=0.001, reads=100):
+    """
+    Sets the node EWMAs, fills the latency windows and the hedge budget, so
+    no timing of the test run decides whether a read is hedged.
+    """
+    for stats, value in zip(client.stats, ewma):
+        stats.observe(value)
+    for window in client.latencies.values():
+        window.extend([latency] * client.min_samples)
+    client.reads = reads
+
+def test_reads_go_to_fastest_node():
+    slow, fast = StubNode("slow"), StubNode("fast")
+    client = HedgedClient([slow, fast], max_hedge_ratio=0, probe_interval=1000)
+    prefill(client, ewma=[0.02, 0.001])
+
+    assert client.search(index="jobs") == {"node": "fast"}
+    assert slow.calls == 0
+
+def test_slow_read_is_hedged():
+    gate = threading.Event()
+    paused, healthy = StubNode("paused", gate), StubNode("healthy")
+    client = HedgedClient([paused, healthy], max_hedge_ratio=1, probe_interval=1000)
+    prefill(client, ewma=[0.001, 0.002])
+
+    # The preferred node never answers before the hedge does
+    assert client.search(index="jobs") == {"node": "healthy"}
+    assert client.hedges == 1
+    gate.set()
+
+def test_hedges_are_capped():
+    client = HedgedClient([StubNode("first"), StubNode("second")], max_hedge_ratio=0.1, probe_interval=1000)
+    prefill(client, ewma=[0.001, 0.002], reads=20)
+
+    client.hedges = 1
+    assert client.hedge_delay("search") == 0.001
+    client.hedges = 2
+    assert client.hedge_delay("search") is None
+
+def test_unreachable_node_fails_over():
+    broken = StubNode("broken", error=ConnectionError("connection refused"))
+    healthy = StubNode("healthy")
+    client = HedgedClient([broken, healthy], probe_interval=1000)
+    prefill(client, ewma=[0.001, 0.002], reads=0)
+
+    assert client.get_source(index="jobs", id=1) == {"node": "healthy"}
+    assert (broken.calls, healthy.calls, client.hedges) == (1, 1, 0)
+
+def test_api_errors_are_not_retried():
+    first = StubNode("first", error=ValueError("bad request"))
+    second = StubNode("second", error=ValueError("bad request"))
+    client = HedgedClient([first, second], probe_interval=1000)
+
+    with pytest.raises(ValueError):
+        client.search(index="jobs")
+    assert first.calls + second.calls == 1
+
+def test_success_wins_over_failure_finished_together(monkeypatch):
+    # The preferred node fails once the hedge answered, and the wait for the
+    # first response reports both requests as done
+    gate = threading.Event()
+    failing = StubNode("failing", gate, error=ConnectionError("connection reset"))
+    healthy = StubNode("healthy", releases=gate)
+    client = HedgedClient([failing, healthy], max_hedge_ratio=1, probe_interval=1000)
+    prefill(client, ewma=[0.001, 0.002])
+    monkeypatch.setattr(
+        hedging, "wait",
+        lambda futures, timeout=None, return_when=None: wait(futures, timeout, ALL_COMPLETED),
+    )
+
+    assert client.search(index="jobs") == {"node": "healthy"}
+    assert client.hedges == 1
+
+def test_export_pages_are_not_hedged():
+    first, second = StubNode("first"), StubNode("second")
+    client = HedgedClient([first, second], max_hedge_ratio=1, probe_interval=1000)
+    prefill(client, ewma=[0.001, 0.002])
+
+    client.search(pit={"id": "pit", "keep_alive": "1m"}, size=1000)
+
+    assert (client.reads, client.hedges) == (100, 0)
+    assert (first.calls, second.calls) == (1, 0)
+
+def test_reads_are_classified_by_kind():
+    assert read_kind("get_source", {"index": "jobs", "id": 1}) == "get_source"
+    assert read_kind("search", {"index": "jobs", "query": {"match_all": {}}}) == "search"
+    assert read_kind("search", {"index": "jobs", "knn": {"field": "skill_vector"}}) == "search:knn"
+    assert read_kind("search", {"index": "jobs", "size": 0, "aggregations": {"a": {}}}) == "search:aggregations"
+    assert read_kind("search", {"body": {"aggs": {"a": {}}}}) == "search:aggregations"
+    assert read_kind("search", {"pit": {"id": "pit"}, "size": 1000}) is None
+
+def test_hedging_pauses_while_losers_run():
+    gate = threading.Event()
+    paused, healthy = StubNode("paused", gate), StubNode("healthy")
+    client = HedgedClient([paused, healthy], max_hedge_ratio=1, probe_interval=1000, max_losers=1)
+    prefill(client, ewma=[0.001, 0.002])
+
+    # The paused node loses the first read and keeps running
+    assert client.search(index="jobs") == {"node": "healthy"}
+    assert (client.hedges, client.losers) == (1, 1)
+
+    # The second read is not hedged and waits for the paused node
+    second = threading.Thread(target=client.search, kwargs={"index": "jobs"})
+    second.start()
+    second.join(timeout=0.05)
+    assert second.is_alive() and client.hedges == 1
+
+    gate.set()
+    second.join()
+    assert client.hedges == 1
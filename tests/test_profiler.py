@@ -0,0 +1,148 @@
+import threading
+import time
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from search_recommend_api.profiler import ProfilerMiddleware, SamplingProfiler
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_busy_thread_is_sampled():
+    profiler = SamplingProfiler(interval=0.001, max_overhead=0.5)
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy-worker")
+    worker.start()
+    profiler.start()
+    time.sleep(0.3)
+    profiler.stop()
+    stop.set()
+    worker.join()
+
+    assert profiler.samples > 0
+    assert "(thread busy-worker)" in profiler.routes()
+    assert "busy_loop (" in profiler.collapsed(route="(thread busy-worker)")
+
+def test_stacks_are_attributed_to_routes():
+    profiler = SamplingProfiler(interval=0.001, max_overhead=0.5)
+    app = FastAPI()
+    app.add_middleware(ProfilerMiddleware, profiler=profiler)
+
+    @app.get("/spin/{id}")
+    async def spin(id: int):
+        deadline = time.perf_counter() + 0.2
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+        return {"id": id}
+
+    with TestClient(app) as client:
+        profiler.start()
+        assert client.get("/spin/1").status_code == 200
+        profiler.stop()
+
+    stacks = profiler.collapsed(route="GET /spin/{id}")
+    assert stacks.startswith("GET /spin/{id};")
+    assert "spin (" in stacks
+
+def test_sync_dependency_is_attributed_to_route():
+    profiler = SamplingProfiler(interval=0.001, max_overhead=0.5)
+    app = FastAPI()
+    app.add_middleware(ProfilerMiddleware, profiler=profiler)
+
+    def spinning_dependency() -> int:
+        # Synchronous, so FastAPI resolves it in the thread pool
+        deadline = time.perf_counter() + 0.2
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+        return 1
+
+    @app.get("/items/{id}")
+    async def item(id: int, value: int = Depends(spinning_dependency)):
+        return {"id": id}
+
+    with TestClient(app) as client:
+        profiler.start()
+        assert client.get("/items/1").status_code == 200
+        profiler.stop()
+
+    assert "spinning_dependency (" in profiler.collapsed(route="GET /items/{id}")
+    assert "spinning_dependency (" not in profiler.collapsed(route="(thread pool)")
+
+def test_interval_backs_off_to_cap_overhead():
+    profiler = SamplingProfiler(interval=0.0001, max_overhead=0.001)
+    profiler.start()
+    time.sleep(0.3)
+    profiler.stop()
+
+    assert profiler.current_interval > profiler.interval
+    assert profiler.overhead < 0.05
+
+def test_sample_is_skipped_over_budget():
+    profiler = SamplingProfiler(interval=0.001, max_overhead=0.01)
+    # As if a second had already been spent sampling
+    profiler.sampling_time = 1.0
+    profiler.start()
+    time.sleep(0.1)
+    profiler.stop()
+
+    assert profiler.samples == 0
+    assert profiler.skipped > 0
+
+def test_threads_are_sampled_in_turn():
+    profiler = SamplingProfiler(max_threads=1)
+    stop = threading.Event()
+    workers = [
+        threading.Thread(target=busy_loop, args=(stop,), name=f"busy-{name}")
+        for name in ("first", "second", "third")
+    ]
+    for worker in workers:
+        worker.start()
+    counts = []
+    for _ in range(6):
+        profiler.sample()
+        counts.append(sum(profiler.routes().values()))
+        time.sleep(0.01)
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    # At most one thread per sample, and every thread in turn
+    assert all(later - earlier <= 1 for earlier, later in zip([0, *counts], counts))
+    assert {"(thread busy-first)", "(thread busy-second)", "(thread busy-third)"} <= set(profiler.routes())
+
+def test_ended_threads_are_forgotten():
+    profiler = SamplingProfiler()
+    stop_waiting, stop_ended = threading.Event(), threading.Event()
+    waiting = threading.Thread(target=stop_waiting.wait)
+    ended = threading.Thread(target=stop_ended.wait)
+    waiting.start()
+    ended.start()
+    profiler.sample()
+    assert {waiting.ident, ended.ident} <= set(profiler._cpu_times)
+
+    stop_ended.set()
+    ended.join()
+    profiler.sample()
+    stop_waiting.set()
+    waiting.join()
+
+    assert ended.ident not in profiler._cpu_times
+    assert waiting.ident in profiler._cpu_times
+
+def test_admin_endpoints_require_token(monkeypatch):
+    from search_recommend_api.router.admin import router as admin_router
+
+    app = FastAPI()
+    app.include_router(admin_router)
+    client = TestClient(app)
+
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.get("/admin/profiler").status_code == 403
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert client.post("/admin/profiler/start").status_code == 401
+    assert client.get("/admin/profiler", headers={"X-Admin-Token": "wrong"}).status_code == 401
+    assert client.get("/admin/profiler", headers={"X-Admin-Token": "secret"}).status_code == 200
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "seed_image"))
+
+from skill_dictionary import SkillDictionary, skill_key  # noqa: E402
+
+DOCUMENTS = [
+    {"top_skills": ["Node.js", "Python"], "other_skills": ["Softwareentwicklung"]},
+    {"top_skills": ["NodeJS", "Software Engineering"], "other_skills": ["python"]},
+    {"top_skills": ["Node JS", "Go"], "other_skills": None},
+]
+SYNONYMS = {"Software Development": ["Software Engineering", "Softwareentwicklung"], "Go": ["Golang"]}
+
+
+def test_skill_key_ignores_case_and_separators():
+    assert skill_key("Node.js") == skill_key("NodeJS") == skill_key("node_js") == skill_key("Node JS")
+    assert skill_key("C#") != skill_key("C")
+
+def test_spelling_variants_share_an_id():
+    dictionary = SkillDictionary.build(documents=DOCUMENTS, synonyms=SYNONYMS)
+
+    assert len(set(dictionary.ids_for(["Node.js", "NodeJS", "Node JS"]))) == 1
+    assert dictionary.ids_for(["Python"]) == dictionary.ids_for(["python"])
+
+def test_synonyms_are_merged_under_their_canonical_name():
+    dictionary = SkillDictionary.build(documents=DOCUMENTS, synonyms=SYNONYMS)
+
+    skill_ids = dictionary.ids_for(["Softwareentwicklung", "Software Engineering", "Software Development"])
+    assert len(skill_ids) == 1
+    assert dictionary.names[skill_ids[0]] == "Software Development"
+    # A synonym that does not occur in the documents still maps to its group
+    assert dictionary.ids_for(["Golang"]) == dictionary.ids_for(["Go"])
+
+def test_most_frequent_skills_get_the_smallest_ids():
+    dictionary = SkillDictionary.build(documents=DOCUMENTS, synonyms=SYNONYMS)
+
+    assert dictionary.ids_for(["Node.js"]) == [0]
+    assert len(dictionary) == 4
+
+def test_ids_are_deduplicated_in_input_order():
+    dictionary = SkillDictionary.build(documents=DOCUMENTS, synonyms=SYNONYMS)
+
+    assert dictionary.ids_for(["Go", "Node.js", "NodeJS"]) == dictionary.ids_for(["Go"]) + dictionary.ids_for(["Node.js"])
+
+def test_unknown_skill_raises_key_error():
+    dictionary = SkillDictionary.build(documents=DOCUMENTS, synonyms=SYNONYMS)
+
+    with pytest.raises(KeyError):
+        dictionary.ids_for(["Cobol"])
+
+def test_add_skill_ids_handles_missing_skills():
+    dictionary = SkillDictionary.build(documents=DOCUMENTS, synonyms=SYNONYMS)
+    document = dictionary.add_skill_ids({"top_skills": ["Golang"], "other_skills": None})
+
+    assert document["top_skill_ids"] == dictionary.ids_for(["Go"])
+    assert document["other_skill_ids"] == []